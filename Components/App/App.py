@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 
 from Components.BigButton.BigButton import BigButton
 from Components.ColormapMenu.ColormapMenu import ColormapMenu
@@ -79,6 +77,7 @@ class App(QWidget):
         # mini settings bar, including cog igon, colorpicker, etc..
         self.mainSettingsBar = MainToolbar()
         self.mainSettingsBar.addLayerButton.clicked.connect(self.addNewGraphItem)
+        self.mainSettingsBar.hudAction.toggled.connect(self.graphView.setHUDVisible)
 
         # add all objects to main layout
         mainLayout.addWidget(self.mainSettingsBar, 0, 0)
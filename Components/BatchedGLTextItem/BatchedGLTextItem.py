@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+
+import numpy as np
+
+import pyqtgraph.opengl as gl
+import OpenGL.GL as ogl
+
+from PyQt5.QtGui import (QColor, QFont, QFontMetrics, QImage, QPainter)
+from PyQt5.QtCore import Qt
+
+from Components.utils.Profiler import profiler
+
+
+class BatchedGLTextItem(gl.GLGraphicsItem.GLGraphicsItem):
+    """
+    Draws many text labels anchored at 3D points in a single draw call.
+
+    Every distinct (text, font) is rasterized once into a texture atlas, and
+    the labels are drawn as textured quads that always face the camera and
+    keep a constant size on screen (like GLViewWidget.renderText, whose
+    baseline starts at the anchor). The atlas is only rebuilt when a label's
+    text or font changes; moving labels just moves their quads.
+    """
+    # width of the atlas in pixels, labels are packed into shelves of this width
+    atlasWidth = 1024
+
+    def __init__(self, color=(1.0, 1.0, 1.0, 1.0)):
+        gl.GLGraphicsItem.GLGraphicsItem.__init__(self)
+        self.color = color
+        # [X, Y, Z, text, font] per label
+        self.labels = []
+
+        self.texture = None
+        # (text, font key): (u0, v0, u1, v1, width, height, descent)
+        self.atlasRects = {}
+        self.atlasDirty = True
+        self.setGLOptions('translucent')
+
+        # inside batch() updates are held back and issued once at the end
+        self.batching = 0
+        self.updatePending = False
+
+    @contextmanager
+    def batch(self):
+        '''Groups label changes so that they cause a single update().
+        '''
+        self.batching += 1
+        try:
+            yield self
+        finally:
+            self.batching -= 1
+            if self.batching == 0 and self.updatePending:
+                self.updatePending = False
+                self.update()
+
+    def requestUpdate(self):
+        if self.batching:
+            self.updatePending = True
+        else:
+            self.update()
+
+    def addLabel(self, X, Y, Z, text, font=QFont('Arial', pointSize=12, weight=150)):
+        '''Adds a label and returns its index.
+        '''
+        self.labels.append([X, Y, Z, text, font])
+        self.atlasDirty = True
+        self.requestUpdate()
+        return len(self.labels) - 1
+
+    def setLabel(self, index, X=None, Y=None, Z=None, text=None, font=None):
+        '''Changes any of the properties of the label at *index*, with a single update.
+        '''
+        label = self.labels[index]
+        for i, value in enumerate((X, Y, Z)):
+            if value is not None:
+                label[i] = value
+        if (text is not None and text != label[3]) or (font is not None and font != label[4]):
+            label[3] = label[3] if text is None else text
+            label[4] = label[4] if font is None else font
+            self.atlasDirty = True
+        self.requestUpdate()
+
+    def clear(self):
+        self.labels = []
+        self.atlasDirty = True
+        self.requestUpdate()
+
+    @staticmethod
+    def fontKey(font):
+        return font.toString()
+
+    def buildAtlas(self):
+        '''Rasterizes every distinct label into one RGBA image, packed in shelves.
+        '''
+        entries = {}
+        for X, Y, Z, text, font in self.labels:
+            entries[(text, self.fontKey(font))] = (text, font)
+
+        placed = {}
+        x = y = shelf = 0
+        for key, (text, font) in sorted(entries.items(), key=lambda item: -QFontMetrics(item[1][1]).height()):
+            metrics = QFontMetrics(font)
+            width, height = metrics.horizontalAdvance(text) + 2, metrics.height() + 2
+            if x + width > self.atlasWidth:
+                x, y, shelf = 0, y + shelf, 0
+            placed[key] = (x, y, width, height, metrics.ascent(), metrics.descent())
+            x += width
+            shelf = max(shelf, height)
+
+        atlasHeight = max(y + shelf, 1)
+        image = QImage(self.atlasWidth, atlasHeight, QImage.Format_RGBA8888)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setPen(QColor(255, 255, 255))
+        for key, (x, y, width, height, ascent, descent) in placed.items():
+            text, font = entries[key]
+            painter.setFont(font)
+            painter.drawText(x + 1, y + 1 + ascent, text)
+        painter.end()
+
+        self.atlasRects = {key: (x/self.atlasWidth, y/atlasHeight,
+                                 (x + width)/self.atlasWidth, (y + height)/atlasHeight,
+                                 width, height, descent + 1)
+                           for key, (x, y, width, height, ascent, descent) in placed.items()}
+        return image
+
+    def uploadAtlas(self):
+        image = self.buildAtlas()
+        bits = image.constBits()
+        bits.setsize(image.byteCount())
+        if self.texture is None:
+            self.texture = ogl.glGenTextures(1)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER, ogl.GL_LINEAR)
+        ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MAG_FILTER, ogl.GL_LINEAR)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 4)
+        ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, ogl.GL_RGBA8, image.width(), image.height(), 0,
+                         ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE, np.frombuffer(bits, dtype=np.uint8))
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+        self.atlasDirty = False
+
+    def quads(self):
+        '''Returns the (4*N, 3) corners and (4*N, 2) texture coordinates of the
+           labels' camera-facing quads.
+        '''
+        anchors = np.array([label[:3] for label in self.labels], dtype=float)
+        rects = np.array([self.atlasRects[(label[3], self.fontKey(label[4]))] for label in self.labels])
+        u0, v0, u1, v1, width, height, descent = rects.T
+
+        # the camera's right and up directions are the first two rows of the modelview rotation
+        modelview = np.array(ogl.glGetFloatv(ogl.GL_MODELVIEW_MATRIX)).reshape(4, 4)
+        right = modelview[:3, 0]/np.linalg.norm(modelview[:3, 0])
+        up = modelview[:3, 1]/np.linalg.norm(modelview[:3, 1])
+        scale = self.view().pixelSize(anchors)[:, None]
+
+        left, bottom = np.zeros_like(width), -descent
+        corners = []
+        for dx, dy in ((left, bottom), (width, bottom), (width, height - descent), (left, height - descent)):
+            corners.append(anchors + scale*(dx[:, None]*right + dy[:, None]*up))
+        vertexes = np.stack(corners, axis=1).reshape(-1, 3)
+        uvs = np.stack([np.stack([u0, v1], axis=1), np.stack([u1, v1], axis=1),
+                        np.stack([u1, v0], axis=1), np.stack([u0, v0], axis=1)], axis=1).reshape(-1, 2)
+        return vertexes.astype(np.float32), uvs.astype(np.float32)
+
+    def paint(self):
+        with profiler.span('paint', 'labels'):
+            self.drawLabels()
+
+    def drawLabels(self):
+        if not self.labels or self.view() is None:
+            return
+        self.setupGLState()
+        if self.atlasDirty:
+            self.uploadAtlas()
+        vertexes, uvs = self.quads()
+
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        ogl.glColor4f(*self.color)
+        ogl.glEnableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glEnableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+        try:
+            ogl.glVertexPointerf(vertexes)
+            ogl.glTexCoordPointerf(uvs)
+            ogl.glDrawArrays(ogl.GL_QUADS, 0, len(vertexes))
+        finally:
+            ogl.glDisableClientState(ogl.GL_TEXTURE_COORD_ARRAY)
+            ogl.glDisableClientState(ogl.GL_VERTEX_ARRAY)
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+            ogl.glDisable(ogl.GL_TEXTURE_2D)
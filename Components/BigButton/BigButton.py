@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 class BigButton(QPushButton):
     mouseHover = pyqtSignal(bool)
     def __init__(self, icon_name, parent, onClicked = (lambda: None), base_color="#eeeeee", hover_color="#3daee9"):
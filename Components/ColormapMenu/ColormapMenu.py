@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 from Components.utils.GradientIconGenerator import GradientIconGenerator
 from Components.GradientIconButton.GradientIconButton import GradientIconButton
 
@@ -42,9 +40,21 @@ class ColormapMenu(QFrame):
     QFrame containing scroll area drop-down menu displaying colormap icons.
 
     Allows user to select a colormap for a given graph.
+
+    Building the icons is slow, so there is one ColormapMenu per graph, built
+    the first time a colormap menu is opened. Each equation row's menu gets
+    it while it is shown (see attach and detach), and it acts on that row's
+    surface.
     """
-    def __init__(self, name, linkedGraph, parent_settings_bar, parent=None):
+    # linkedGraph: (QWidgetAction, ColormapMenu)
+    shared = {}
+
+    def __init__(self, linkedGraph, parent=None):
         super(ColormapMenu, self).__init__(parent)
+        self.linkedGraph = linkedGraph
+        # the surface and InputSettingsBar the menu currently acts on, see setTarget
+        self.name = None
+        self.settingsBar = None
 
         # Make sure we have a PNG icon for each colormap then locate the icons
         GradientIconGenerator()
@@ -60,10 +70,8 @@ class ColormapMenu(QFrame):
 
         for n, gradient_name in enumerate(gradient_names):
 
-            ilabels[gradient_name] = GradientIconButton(name = name,
-                                                        gradient_name = gradient_name,
-                                                        linkedGraph = linkedGraph,
-                                                        parent_settings_bar=parent_settings_bar)
+            ilabels[gradient_name] = GradientIconButton(gradient_name = gradient_name,
+                                                        colormap_menu = self)
 
             container=QFrame()
             layout = QVBoxLayout(container)
@@ -80,4 +88,28 @@ class ColormapMenu(QFrame):
 
         mainLayout = QGridLayout()
         mainLayout.addWidget(scrollarea)
-        self.setLayout(mainLayout)
\ No newline at end of file
+        self.setLayout(mainLayout)
+
+    def setTarget(self, name, settingsBar):
+        self.name = name
+        self.settingsBar = settingsBar
+
+    @classmethod
+    def attach(cls, menu, name, linkedGraph, settingsBar):
+        """Puts the graph's ColormapMenu (built on first use) into *menu*, acting on the surface *name*."""
+        if linkedGraph not in cls.shared:
+            colormapMenu = ColormapMenu(linkedGraph)
+            action = QWidgetAction(linkedGraph)
+            action.setDefaultWidget(colormapMenu)
+            cls.shared[linkedGraph] = (action, colormapMenu)
+        action, colormapMenu = cls.shared[linkedGraph]
+        colormapMenu.setTarget(name, settingsBar)
+        menu.addAction(action)
+
+    @classmethod
+    def detach(cls, menu, linkedGraph):
+        """Takes the graph's ColormapMenu back out of *menu*, so it isn't deleted along with it."""
+        if linkedGraph in cls.shared:
+            action, colormapMenu = cls.shared[linkedGraph]
+            menu.removeAction(action)
+            colormapMenu.setParent(None)
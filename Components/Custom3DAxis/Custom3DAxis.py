@@ -32,51 +32,83 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
 
-
-from Components.CustomGLTextItem.CustomGLTextItem import CustomGLTextItem
+from Components.BatchedGLTextItem.BatchedGLTextItem import BatchedGLTextItem
+from Components.utils.Profiler import profiler
 class Custom3DAxis(gl.GLAxisItem):
     """Class defined to extend 'gl.GLAxisItem'."""
+    # the 20 lines of the box, as pairs of indexes into the vertexes built by buildGeometry
+    edges = np.array([0, 1, 1, 2, 2, 3, 3, 0,       # horizontal axes at z = 0
+                      4, 5, 5, 6, 6, 7, 7, 4,       # horizontal axes at z = z
+                      8, 9, 9, 10, 10, 11, 11, 8,   # horizontal axes at z = -z
+                      0, 4, 1, 5, 2, 6, 3, 7,       # upper z-axes
+                      0, 8, 1, 9, 2, 10, 3, 11],    # lower z-axes
+                     dtype=np.uint32)
+
     def __init__(self, owner, color = (1.0,1.0,1.0,1.0)):
         super(Custom3DAxis, self).__init__()
         self.owner = owner
         self.c = color
 
-    def add_labels(self):
-        """Adds axes labels."""
-        x,y,z = self.size()
+        # vertex and index buffers, (re)filled in paint whenever geometryDirty is set
+        self.vertexBuffer = None
+        self.indexBuffer = None
+        self.geometryDirty = True
 
-        #X labels
-        x0Label = CustomGLTextItem(X=0, Y=-y - y/5, Z=0, text="X")
-        x0Label.setGLViewWidget(self.owner)
-        self.owner.addItem(x0Label)
+        # all axis and tick labels, drawn together; labelIndexes maps each label's
+        # key to its index in labelItem, so labels are reused rather than added again
+        self.labelItem = None
+        self.labelIndexes = {}
 
-        x1Label = CustomGLTextItem(X=0, Y=y + y/5, Z=0, text="X")
-        x1Label.setGLViewWidget(self.owner)
-        self.owner.addItem(x1Label)
+    def setSize(self, x=None, y=None, z=None, size=None):
+        super(Custom3DAxis, self).setSize(x=x, y=y, z=z, size=size)
+        self.geometryDirty = True
 
-        #Y labels
-        y0Label = CustomGLTextItem(X=-x - x/5, Y=0, Z=0, text="Y")
-        y0Label.setGLViewWidget(self.owner)
-        self.owner.addItem(y0Label)
+    def setColor(self, color):
+        self.c = color
+        self.update()
 
-        y1Label = CustomGLTextItem(X=x + x/5, Y=0, Z=0, text="Y")
-        y1Label.setGLViewWidget(self.owner)
-        self.owner.addItem(y1Label)
+    def buildGeometry(self):
+        """Returns the 12 corners of the box as a float32 array."""
+        x,y,z = self.size()
+        return np.array([(-x, -y,  0),(x, -y, 0),(x, y, 0),(-x, y, 0),
+                         (-x, -y,  z),(x, -y, z),(x, y, z),(-x, y, z),
+                         (-x, -y, -z),(x, -y,-z),(x, y,-z),(-x, y,-z)], dtype=np.float32)
+
+    def labels(self):
+        """Returns the BatchedGLTextItem holding the labels, adding it to the owner first."""
+        if self.labelItem is None:
+            self.labelItem = BatchedGLTextItem()
+            self.owner.addItem(self.labelItem)
+        return self.labelItem
+
+    def set_label(self, key, X, Y, Z, text, font=QFont('Arial', pointSize=12, weight=150)):
+        """Shows a label, reusing the one previously shown under *key* if there is one."""
+        if key in self.labelIndexes:
+            self.labels().setLabel(self.labelIndexes[key], X=X, Y=Y, Z=Z, text=text, font=font)
+        else:
+            self.labelIndexes[key] = self.labels().addLabel(X=X, Y=Y, Z=Z, text=text, font=font)
+
+    def add_labels(self):
+        """Adds axes labels."""
+        x,y,z = self.size()
 
-        #Z labels
-        zLabel = CustomGLTextItem(X=-x - x/5, Y=y + y/5 - 1, Z=0, text="Z")
-        zLabel.setGLViewWidget(self.owner)
-        self.owner.addItem(zLabel)
+        with self.labels().batch():
+            #X labels
+            self.set_label('x0', X=0, Y=-y - y/5, Z=0, text="X")
+            self.set_label('x1', X=0, Y=y + y/5, Z=0, text="X")
 
-        #Z labels
-        zLabel = CustomGLTextItem(X=x + x/5, Y=-y - y/5, Z=0, text="Z")
-        zLabel.setGLViewWidget(self.owner)
-        self.owner.addItem(zLabel)
+            #Y labels
+            self.set_label('y0', X=-x - x/5, Y=0, Z=0, text="Y")
+            self.set_label('y1', X=x + x/5, Y=0, Z=0, text="Y")
+
+            #Z labels
+            self.set_label('z0', X=-x - x/5, Y=y + y/5 - 1, Z=0, text="Z")
+            self.set_label('z1', X=x + x/5, Y=-y - y/5, Z=0, text="Z")
 
     def add_tick_values(self, xticks=[], yticks=[], zticks=[]):
-        """Adds ticks values."""
+        """Adds ticks values. Calling it again (after the owner's ranges or the
+        axis size changed) updates the existing tick labels in place."""
         x,y,z = self.size()
         xpos = np.linspace(-x, x, 11)[1:-1]
         ypos = np.linspace(-y, y, 11)[1:-1]
@@ -84,125 +116,57 @@ class Custom3DAxis(gl.GLAxisItem):
         xticks = np.linspace(-self.owner.xrange, self.owner.xrange, 11)[1:-1]
         yticks = np.linspace(-self.owner.yrange, self.owner.yrange, 11)[1:-1]
         zticks = np.linspace(-z, z, 11)[1:-1]
-        tickfontsize = 8
-        #X labels
-        for i, xt in enumerate(xticks):
-            val = CustomGLTextItem(X=xpos[i], Y=-y - y/15, Z=0, text=str(xt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
-        for i, xt in enumerate(xticks):
-            val = CustomGLTextItem(X=xpos[i], Y=y + y/15, Z=0, text=str(xt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
-
-        #Y labels
-        for i, yt in enumerate(yticks):
-            val = CustomGLTextItem(X=-x - x/15, Y=ypos[i], Z=0, text=str(yt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
-        for i, yt in enumerate(yticks):
-            val = CustomGLTextItem(X=x + x/15, Y=ypos[i], Z=0, text=str(yt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
-
-        #Z labels
-        for i, zt in enumerate(zticks):
-            val = CustomGLTextItem(X=-x - x/10, Y=y + y/10, Z=zpos[i], text=str(zt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
-        for i, zt in enumerate(zticks):
-            val = CustomGLTextItem(X=x + x/10, Y=-y - y/10, Z=zpos[i], text=str(zt.round(3)),
-                                 font=QFont('Arial', pointSize=tickfontsize, weight=50))
-            val.setGLViewWidget(self.owner)
-            self.owner.addItem(val)
+        tickfont = QFont('Arial', pointSize=8, weight=50)
+
+        with self.labels().batch():
+            #X labels
+            for i, xt in enumerate(xticks):
+                self.set_label(('xtick0', i), X=xpos[i], Y=-y - y/15, Z=0, text=str(xt.round(3)), font=tickfont)
+                self.set_label(('xtick1', i), X=xpos[i], Y=y + y/15, Z=0, text=str(xt.round(3)), font=tickfont)
+
+            #Y labels
+            for i, yt in enumerate(yticks):
+                self.set_label(('ytick0', i), X=-x - x/15, Y=ypos[i], Z=0, text=str(yt.round(3)), font=tickfont)
+                self.set_label(('ytick1', i), X=x + x/15, Y=ypos[i], Z=0, text=str(yt.round(3)), font=tickfont)
+
+            #Z labels
+            for i, zt in enumerate(zticks):
+                self.set_label(('ztick0', i), X=-x - x/10, Y=y + y/10, Z=zpos[i], text=str(zt.round(3)), font=tickfont)
+                self.set_label(('ztick1', i), X=x + x/10, Y=-y - y/10, Z=zpos[i], text=str(zt.round(3)), font=tickfont)
+
+    def update_tick_values(self):
+        """Moves and relabels the axis and tick labels after a change of range or size."""
+        with self.labels().batch():
+            self.add_labels()
+            self.add_tick_values()
 
     def paint(self):
+        with profiler.span('paint', 'axis'):
+            self.drawBox()
+
+    def drawBox(self):
         self.setupGLState()
         if self.antialias:
             ogl.glEnable(ogl.GL_LINE_SMOOTH)
             ogl.glHint(ogl.GL_LINE_SMOOTH_HINT, ogl.GL_NICEST)
-        ogl.glBegin(ogl.GL_LINES)
-
-        x,y,z = self.size()
-
-        # vertices
-        v = [(-x, -y,  0),(x, -y, 0),(x, y, 0),(-x, y, 0),
-             (-x, -y,  z),(x, -y, z),(x, y, z),(-x, y, z),
-             (-x, -y, -z),(x, -y,-z),(x, y,-z),(-x, y,-z)]
-
-        # HORIZONTAL AXIS AT Z = 0
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[0][0],v[0][1],v[0][2])
-        ogl.glVertex3f(v[1][0],v[1][1],v[1][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[1][0],v[1][1],v[1][2])
-        ogl.glVertex3f(v[2][0],v[2][1],v[2][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[2][0],v[2][1],v[2][2])
-        ogl.glVertex3f(v[3][0],v[3][1],v[3][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[3][0],v[3][1],v[3][2])
-        ogl.glVertex3f(v[0][0],v[0][1],v[0][2])
-
-        # HORIZONTAL AXIS AT Z = z
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[4][0],v[4][1],v[4][2])
-        ogl.glVertex3f(v[5][0],v[5][1],v[5][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[5][0],v[5][1],v[5][2])
-        ogl.glVertex3f(v[6][0],v[6][1],v[6][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[6][0],v[6][1],v[6][2])
-        ogl.glVertex3f(v[7][0],v[7][1],v[7][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[7][0],v[7][1],v[7][2])
-        ogl.glVertex3f(v[4][0],v[4][1],v[4][2])
-
-        # HORIZONTAL AXIS AT Z = -z
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[8][0],v[8][1],v[8][2])
-        ogl.glVertex3f(v[9][0],v[9][1],v[9][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[9][0],v[9][1],v[9][2])
-        ogl.glVertex3f(v[10][0],v[10][1],v[10][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[10][0],v[10][1],v[10][2])
-        ogl.glVertex3f(v[11][0],v[11][1],v[11][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[11][0],v[11][1],v[11][2])
-        ogl.glVertex3f(v[8][0],v[8][1],v[8][2])
-
-        # UPPER Z-AXES
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[0][0],v[0][1],v[0][2])
-        ogl.glVertex3f(v[4][0],v[4][1],v[4][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[1][0],v[1][1],v[1][2])
-        ogl.glVertex3f(v[5][0],v[5][1],v[5][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[2][0],v[2][1],v[2][2])
-        ogl.glVertex3f(v[6][0],v[6][1],v[6][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[3][0],v[3][1],v[3][2])
-        ogl.glVertex3f(v[7][0],v[7][1],v[7][2])
-
-        # LOWER Z-AXES
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[0][0],v[0][1],v[0][2])
-        ogl.glVertex3f(v[8][0],v[8][1],v[8][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[1][0],v[1][1],v[1][2])
-        ogl.glVertex3f(v[9][0],v[9][1],v[9][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[2][0],v[2][1],v[2][2])
-        ogl.glVertex3f(v[10][0],v[10][1],v[10][2])
-        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
-        ogl.glVertex3f(v[3][0],v[3][1],v[3][2])
-        ogl.glVertex3f(v[11][0],v[11][1],v[11][2])
 
-        ogl.glEnd()
+        if self.vertexBuffer is None:
+            self.vertexBuffer, self.indexBuffer = ogl.glGenBuffers(2)
+            ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, self.indexBuffer)
+            ogl.glBufferData(ogl.GL_ELEMENT_ARRAY_BUFFER, self.edges.nbytes, self.edges, ogl.GL_STATIC_DRAW)
+            self.geometryDirty = True
+        ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self.vertexBuffer)
+        if self.geometryDirty:
+            vertexes = self.buildGeometry()
+            ogl.glBufferData(ogl.GL_ARRAY_BUFFER, vertexes.nbytes, vertexes, ogl.GL_STATIC_DRAW)
+            self.geometryDirty = False
+
+        # the whole box is one color, one draw call
+        ogl.glColor4f(self.c[0], self.c[1], self.c[2], self.c[3])
+        ogl.glEnableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glVertexPointer(3, ogl.GL_FLOAT, 0, None)
+        ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, self.indexBuffer)
+        ogl.glDrawElements(ogl.GL_LINES, len(self.edges), ogl.GL_UNSIGNED_INT, None)
+        ogl.glDisableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, 0)
+        ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, 0)
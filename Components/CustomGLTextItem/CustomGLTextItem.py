@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 class CustomGLTextItem(gl.GLGraphicsItem.GLGraphicsItem):
     def __init__(self, X, Y, Z, text, font = QFont('Arial', pointSize=12, weight=150)):
         gl.GLGraphicsItem.GLGraphicsItem.__init__(self)
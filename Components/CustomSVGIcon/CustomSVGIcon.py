@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 class CustomSVGIcon():
     def __init__(self, icon_name, hex_color):
         root = QFileInfo(__file__).absolutePath()
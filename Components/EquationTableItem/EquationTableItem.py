@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 
 from Components.BigButton.BigButton import BigButton
 from Components.ColormapMenu.ColormapMenu import ColormapMenu
@@ -49,10 +47,16 @@ from Components.MainToolbar.MainToolbar import MainToolbar
 from Components.MiniButton.MiniButton import MiniButton
 from Components.MiniGradientButton.MiniGradientButton import MiniGradientButton
 from Components.SurfacePlot.SurfacePlot import SurfacePlot
+from Components.utils.ExpressionCache import expressionCache
+from Components.utils.Metrics import getMetric
+from Components.utils.Simplifier import getSimplifier
 
 
 
 class EquationTableItem(QFrame):
+    # quiet period (ms) after the last keystroke before the equation is parsed and typeset
+    typingDelay = 150
+
     def __init__(self, name, linkedGraph, parent=None):
         super(EquationTableItem, self).__init__(parent)
 
@@ -67,13 +71,21 @@ class EquationTableItem(QFrame):
 
         # math expression input box
         self.display = EquationInput("")
-        self.display.textChanged.connect(self.showLatex)
+        self.display.textChanged.connect(self.queueLatex)
+
+        # coalesces bursts of keystrokes so only the latest text is processed
+        self.typingTimer = QTimer(self)
+        self.typingTimer.setSingleShot(True)
+        self.typingTimer.setInterval(self.typingDelay)
+        self.typingTimer.timeout.connect(self.showLatex)
+        self.pendingSince = None # time of the first keystroke not yet rendered
 
         # option to simplify the math expression in LaTeX output
         self.simplifyExpression = QCheckBox("Simplify", self)
         self.simplifyExpression.stateChanged.connect(self.simplifyChecked)
         self.simplifyExpressionChecked = False
         self.simplifyExpression.setMaximumHeight(15)
+        getSimplifier().finished.connect(self.simplified)
 
         # mini settings bar, including cog igon, colorpicker, etc..
         self.settingsBar = InputSettingsBar(name = self.name, linkedGraph = self.linkedGraph, parent = self)
@@ -83,8 +95,7 @@ class EquationTableItem(QFrame):
         self.hidden = False
 
         # latex view
-        self.mathJaxWebView = LatexDisplay()
-        self.mathJaxWebView.loadFinished.connect(self.showLatex)
+        self.latexDisplay = LatexDisplay()
 
         # setup input table layout and sizing
         self.setMaximumHeight(150)
@@ -94,7 +105,7 @@ class EquationTableItem(QFrame):
         self.layout.addWidget(self.display, 0, 0, 2, 1)
         self.layout.addWidget(self.settingsBar, 0, 1)
         self.layout.addWidget(self.simplifyExpression, 1, 1)
-        self.layout.addWidget(self.mathJaxWebView, 2, 0, 3, 1)
+        self.layout.addWidget(self.latexDisplay, 2, 0, 3, 1)
 
         self.setStyleSheet("""
                             EquationTableItem {
@@ -107,6 +118,7 @@ class EquationTableItem(QFrame):
 
         self.setLayout(self.layout)
         self.display.setFocus() # bring text input box into keyboard focus
+        self.showLatex()
 
     def fadeInAnimator(obj):
         opacity_effect = QGraphicsOpacityEffect(self)
@@ -121,6 +133,10 @@ class EquationTableItem(QFrame):
         self.fadeIn.start(QPropertyAnimation.DeleteWhenStopped)
 
     def deleteGraphItem(self):
+        self.linkedGraph.evaluator.cancel(self.name)
+        # free the surface's vertex buffers while the graph's GL context is current
+        self.linkedGraph.makeCurrent()
+        self.linkedGraph.data[self.name].renderer.release()
         self.linkedGraph.removeItem(self.linkedGraph.data[self.name])
         del self.linkedGraph.data[self.name]
         self.parent().removeInputItem(self.name)
@@ -136,7 +152,7 @@ class EquationTableItem(QFrame):
 
     def simplifyChecked(self, state):
         '''If 'Simplify' checkbox is checked, this simplifies the
-           equation before returning MathJax-rendered equation
+           equation before returning the typeset equation
         '''
         if state == Qt.Checked:
             self.simplifyExpressionChecked = True
@@ -144,53 +160,86 @@ class EquationTableItem(QFrame):
             self.simplifyExpressionChecked = False
         self.showLatex()
 
+    def compiledInput(self):
+        '''Returns the cached parse of the user's equation for the current 'Simplify' setting.
+        '''
+        return expressionCache.lookup(self.display.text(), self.simplifyExpressionChecked)
+
     def validateInput(self):
         '''Checks user's equation to see if it is valid and gives visual feedback.
         '''
-        try:
-            lambdify((self.x, self.y), sympify(self.display.text()))(1,1)
+        if self.compiledInput().valid:
             self.display.setStyleSheet('''QLineEdit:hover {border: 0.2ex solid #3daee9;}
                                           QLineEdit:focus {border: 0.2ex solid #3daee9;}
             ''')
             return True
-        except:
+        else:
             self.display.setStyleSheet('''QLineEdit:hover {border: 0.2ex solid #ee1111;}
                                           QLineEdit:focus {border: 0.2ex solid #ee1111;}
             ''')
             return False
 
+    def setTypingDelay(self, ms):
+        self.typingDelay = ms
+        self.typingTimer.setInterval(ms)
+
+    def queueLatex(self):
+        '''Restarts the quiet period; showLatex only runs once typing pauses.
+        '''
+        if self.pendingSince is None:
+            self.pendingSince = time.perf_counter()
+        self.typingTimer.start()
+
     def showLatex(self):
         '''Renders and displays the typesetted equation if user input is valid.
         '''
-        if self.validateInput() == True:
-            try:
-                if self.simplifyExpressionChecked == True:
-                    expressionValue = latex(sympify(self.display.text()))
-                else:
-                    expressionValue = latex(sympify(self.display.text(), evaluate=False))
+        self.typingTimer.stop()
+        typedAt, self.pendingSince = self.pendingSince, None
 
-                self.updateJax(expressionValue)
-
-            except Exception as err:
-                print(err)
+        if self.validateInput() == True:
+            expressionValue = self.compiledInput().latex
+            if self.simplifyExpressionChecked:
+                expressionValue = self.simplifiedLatex(expressionValue)
+            if expressionValue is not None:
+                self.updateLatex(expressionValue, typedAt)
         elif self.display.text() == "" or all(self.display.text()) == " ":
-            self.updateJax("...")
+            self.updateLatex("...", typedAt)
         else:
             pass
 
-    def updateJax(self, newMath):
-        '''Sends user's equation as string to JS MathJax renderer in LatexDisplay.
+    def simplifiedLatex(self, fallback):
+        '''Returns the LaTeX of the simplified equation if it is ready. Otherwise
+           starts simplifying it in the background (see simplified) and returns
+           *fallback* meanwhile.
         '''
-        self.mathJaxWebView.page().runJavaScript("updateMathJax(\"$${}$$\")".format(newMath.replace("\\", "\\\\")))
+        text = expressionCache.normalize(self.display.text())
+        done, simplifiedLatex = getSimplifier().lookup(text)
+        if not done:
+            getSimplifier().request(text)
+        return fallback if simplifiedLatex is None else simplifiedLatex
+
+    def simplified(self, text, simplifiedLatex):
+        '''Shows a simplification finished by the Simplifier, if it is still the one wanted.
+        '''
+        if (simplifiedLatex is not None and self.simplifyExpressionChecked
+                and text == expressionCache.normalize(self.display.text())):
+            self.updateLatex(simplifiedLatex)
+
+    def updateLatex(self, newMath, typedAt=None):
+        '''Shows the user's equation, typeset by the shared LatexRenderer, in LatexDisplay.
+        '''
+        self.latexDisplay.setLatex(newMath)
+        if typedAt is not None:
+            getMetric("equation.keystroke_to_render").record(1000*(time.perf_counter() - typedAt))
 
     def updateGraphView(self):
         graphViewItem = self.linkedGraph.data[self.name]
 
         if self.validateInput() == True:
             try:
-                expressionValue = sympify(self.display.text())
-
-                graphViewItem.equation = lambdify((self.x, self.y), expressionValue)
+                compiled = self.compiledInput()
+                graphViewItem.expression = compiled.expression
+                graphViewItem.equation = compiled.function
                 graphViewItem.updatePlot()
             except Exception:
                 traceback.print_exc()
@@ -32,19 +32,14 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
+from Components.utils.GradientIcons import gradientIcons
 
 
 class GradientIconButton(QToolButton):
-    def __init__(self, name, gradient_name, linkedGraph, parent_settings_bar, parent=None):
+    def __init__(self, gradient_name, colormap_menu, parent=None):
         super(GradientIconButton, self).__init__(parent)
-        self.name = name
         self.gradient_name = gradient_name
-        self.linkedGraph = linkedGraph
-
-        imgdata = open("styles/assets/icons/gradients/"+gradient_name+'.png', 'rb').read()
-        pixmap = self.mask_image(imgdata)
+        self.colormapMenu = colormap_menu
 
         self.setStyleSheet("""
                             GradientIconButton {
@@ -69,64 +64,19 @@ class GradientIconButton(QToolButton):
                             }
                            """)
 
-        self.setIcon(QIcon(pixmap))
+        self.setIcon(gradientIcons.icon(gradient_name))
         self.setToolTip(gradient_name)
 
         self.clicked.connect(self.setColormap)
-        self.clicked.connect(lambda: self.changeIndicatorIcon(parent_settings_bar, gradient_name, QIcon(pixmap)))
-
-    def mask_image(self, imgdata, imgtype='png', size=35):
-        """Return a ``QPixmap`` from *imgdata* masked with a smooth circle.
-
-        *imgdata* are the raw image bytes, *imgtype* denotes the image type.
-
-        The returned image will have a size of *size* × *size* pixels.
-        """
-        # Load image and convert to 32-bit ARGB (adds an alpha channel):
-        image = QImage.fromData(imgdata, imgtype)
-        image.convertToFormat(QImage.Format_ARGB32)
-
-        # Crop image to a square:
-        imgsize = min(image.width(), image.height())
-        rect = QRect(
-            (image.width() - imgsize) / 2,
-            (image.height() - imgsize) / 2,
-            imgsize,
-            imgsize,
-        )
-        image = image.copy(rect)
-
-        # Create the output image with the same dimensions and an alpha channel
-        # and make it completely transparent:
-        out_img = QImage(imgsize, imgsize, QImage.Format_ARGB32)
-        out_img.fill(Qt.transparent)
-
-        # Create a texture brush and paint a circle with the original image onto
-        # the output image:
-        brush = QBrush(image)        # Create texture brush
-        painter = QPainter(out_img)  # Paint the output image
-        painter.setBrush(brush)      # Use the image texture brush
-        painter.setPen(Qt.NoPen)     # Don't draw an outline
-        painter.setRenderHint(QPainter.Antialiasing, True)  # Use AA
-        painter.drawEllipse(0, 0, imgsize, imgsize)  # Actually draw the circle
-        painter.end()                # We are done (segfault if you forget this)
-
-        # Convert the image to a pixmap and rescale it.  Take pixel ratio into
-        # account to get a sharp image on retina displays:
-        pr = QWindow().devicePixelRatio()
-        pm = QPixmap.fromImage(out_img)
-        pm.setDevicePixelRatio(pr)
-        size *= pr
-        pm = pm.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-
-        return pm
+        self.clicked.connect(lambda: self.changeIndicatorIcon(self.colormapMenu.settingsBar, gradient_name, self.icon()))
 
     def setColormap(self):
         """
-        Button action. Applies colormap to respective surface plot.
+        Button action. Applies colormap to the surface plot the menu currently acts on.
         """
-        self.linkedGraph.data[self.name].setColormap(cmap_name=self.gradient_name)
-        self.linkedGraph.setFocus()
+        linkedGraph = self.colormapMenu.linkedGraph
+        linkedGraph.data[self.colormapMenu.name].setColormap(cmap_name=self.gradient_name)
+        linkedGraph.setFocus()
 
     def changeIndicatorIcon(self, parent_settings_bar, gradient_name, qicon):
         parent_settings_bar.cmapButton.setCustomIcon(gradient_name, qicon)
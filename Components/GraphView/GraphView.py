@@ -32,13 +32,16 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 
 from Components.Custom3DAxis.Custom3DAxis import Custom3DAxis
+from Components.PerformanceHUD.PerformanceHUD import PerformanceHUD
 from Components.SurfacePlot.SurfacePlot import SurfacePlot
+from Components.utils.SurfaceEvaluator import SurfaceEvaluator
 
 class GraphView(gl.GLViewWidget):
+    # set up in __init__, after GLViewWidget (which already repaints) is
+    frameTimer = None
+
     def __init__(self, parent=None):
         super(GraphView, self).__init__(parent)
 
@@ -50,6 +53,28 @@ class GraphView(gl.GLViewWidget):
         # dictionary for storing all graph objects
         self.data = {}
 
+        # evaluates surfaces on a thread pool so the GUI stays responsive
+        self.evaluator = SurfaceEvaluator(owner=self, parent=self)
+
+        # repaints requested through update() (by items, the camera and the
+        # axis labels) are coalesced into at most one frame every frameInterval ms
+        self.frameInterval = 16
+        self.framesRequested = 0
+        self.framesRendered = 0
+        self.frameTimer = QTimer(self)
+        self.frameTimer.setSingleShot(True)
+        self.frameTimer.timeout.connect(self.renderFrame)
+
+        # while the camera is being dragged or zoomed, surfaces are drawn at a
+        # coarser level of detail with at most interactionPoints points per side;
+        # full resolution comes back once the view has been idle for idleDelay ms
+        self.interacting = False
+        self.interactionPoints = 101
+        self.idleDelay = 200
+        self.idleTimer = QTimer(self)
+        self.idleTimer.setSingleShot(True)
+        self.idleTimer.timeout.connect(self.endInteraction)
+
         # style and size of the GLViewWidget
         self.sizeHint = lambda: QSize(100, 450)
         self.setMinimumWidth(500)
@@ -57,18 +82,70 @@ class GraphView(gl.GLViewWidget):
         self.setBackgroundColor('#31363b')
 
         # Setup the axis and add it to the figure
-        axis = Custom3DAxis(owner=self, color=(1.,1.,1.,.25))
-        axis.setSize(x=self.resolution, y=self.resolution, z=self.resolution)
+        # (kept so that a change of xrange/yrange can relabel it with axis.update_tick_values())
+        self.axis = Custom3DAxis(owner=self, color=(1.,1.,1.,.25))
+        self.axis.setSize(x=self.resolution, y=self.resolution, z=self.resolution)
 
-        axis.add_labels()
-        axis.add_tick_values()
-        self.addItem(axis)
+        self.axis.add_labels()
+        self.axis.add_tick_values()
+        self.addItem(self.axis)
 
         self.setCameraPosition(distance=80)#, elevation=42, azimuth=42)
 
+        # performance overlay, created the first time it is shown
+        self.hud = None
+
+    def update(self):
+        '''Schedules a repaint, unless one already is.
+        '''
+        if self.frameTimer is None:
+            return super(GraphView, self).update()
+        self.framesRequested += 1
+        if not self.frameTimer.isActive():
+            self.frameTimer.start(self.frameInterval)
+
+    def renderFrame(self):
+        super(GraphView, self).update()
+
+    def paintGL(self, *args, **kwds):
+        self.framesRendered += 1
+        super(GraphView, self).paintGL(*args, **kwds)
+
+    def beginInteraction(self):
+        self.idleTimer.stop()
+        self.interacting = True
+
+    def endInteraction(self):
+        if QApplication.mouseButtons() != Qt.NoButton:
+            # still dragging, just not moving
+            return
+        self.interacting = False
+        self.update()
+
+    def mousePressEvent(self, ev):
+        self.beginInteraction()
+        super(GraphView, self).mousePressEvent(ev)
+
+    def mouseReleaseEvent(self, ev):
+        super(GraphView, self).mouseReleaseEvent(ev)
+        self.idleTimer.start(self.idleDelay)
+
+    def wheelEvent(self, ev):
+        self.beginInteraction()
+        super(GraphView, self).wheelEvent(ev)
+        self.idleTimer.start(self.idleDelay)
+
+    def setHUDVisible(self, visible):
+        if self.hud is None:
+            if not visible:
+                return
+            self.hud = PerformanceHUD(owner=self)
+            self.addItem(self.hud)
+        self.hud.setActive(visible)
+
     def addPlotItem(self, name):
         # generate a colormap for the surface
-        self.data[name] = SurfacePlot(resolution=self.resolution, owner=self)
+        self.data[name] = SurfacePlot(name=name, resolution=self.resolution, owner=self)
 
         # show the GLSurfacePlotItem in the GLViewWidget
         self.addItem(self.data[name])
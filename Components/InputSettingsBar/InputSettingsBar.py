@@ -30,14 +30,13 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QSizePolicy, QToolButton, QWidget, QLabel, QCheckBox,
                              QTableView, QTableWidget, QTableWidgetItem, QToolBar,
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
-                             QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
-
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+                             QMenu, QVBoxLayout, QScrollArea, QWidgetAction, QActionGroup)
 
 
 from Components.MiniGradientButton.MiniGradientButton import MiniGradientButton
 from Components.ColormapMenu.ColormapMenu import ColormapMenu
 from Components.MiniButton.MiniButton import MiniButton
+from Components.utils.EvaluationBackends import backends, availableBackends
 
 class InputSettingsBar(QToolBar):
     def __init__(self, name, linkedGraph, parent):
@@ -46,14 +45,48 @@ class InputSettingsBar(QToolBar):
 
         self.cmapButton = MiniGradientButton(gradient_name = linkedGraph.data[name].cmap_name)
 
-        self.cmapMenuDisplay = ColormapMenu(name=name, linkedGraph = linkedGraph, parent_settings_bar=self)
-        self.cmapButton.setMenu(QMenu(self.cmapButton))
-        showColormapMenu = QWidgetAction(self.cmapButton)
-        showColormapMenu.setDefaultWidget(self.cmapMenuDisplay)
-        self.cmapButton.menu().addAction(showColormapMenu)
+        # the colormap icons are only in the menu while it is open, they are shared by every row
+        cmapMenu = QMenu(self.cmapButton)
+        cmapMenu.aboutToShow.connect(lambda: ColormapMenu.attach(cmapMenu, name, linkedGraph, self))
+        cmapMenu.aboutToHide.connect(lambda: ColormapMenu.detach(cmapMenu, linkedGraph))
+        self.cmapButton.setMenu(cmapMenu)
 
         self.settingsButton = MiniButton(root+'/../../styles/assets/icons/cog.png',
                                          parent = self)
+        self.settingsButton.setMenu(QMenu(self.settingsButton))
+
+        # sample the equation on a curvature-adaptive mesh rather than a uniform grid
+        self.adaptiveAction = self.settingsButton.menu().addAction("Adaptive sampling")
+        self.adaptiveAction.setCheckable(True)
+        self.adaptiveAction.toggled.connect(
+            lambda checked: linkedGraph.data[name].setSamplingMode('adaptive' if checked else 'uniform'))
+
+        # map heights to colors in a shader instead of computing vertex colors
+        self.shaderColorsAction = self.settingsButton.menu().addAction("Color on GPU")
+        self.shaderColorsAction.setCheckable(True)
+        self.shaderColorsAction.toggled.connect(
+            lambda checked: linkedGraph.data[name].setColorMode('shader' if checked else 'vertex'))
+
+        # numeric backend used to evaluate the equation
+        backendMenu = self.settingsButton.menu().addMenu("Evaluation backend")
+        self.backendActions = QActionGroup(self)
+        for backend in backends:
+            action = backendMenu.addAction(backend)
+            action.setCheckable(True)
+            action.setChecked(backend == linkedGraph.data[name].backend)
+            action.setEnabled(backend in availableBackends())
+            action.triggered.connect(lambda checked, backend=backend: linkedGraph.data[name].setBackend(backend))
+            self.backendActions.addAction(action)
+
+        # what to do with points where the equation is undefined
+        fillMenu = self.settingsButton.menu().addMenu("Undefined points")
+        self.fillActions = QActionGroup(self)
+        for mode, label in [('fill', "Fill in"), ('holes', "Leave holes")]:
+            action = fillMenu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(mode == linkedGraph.data[name].fillMode)
+            action.triggered.connect(lambda checked, mode=mode: linkedGraph.data[name].setFillMode(mode))
+            self.fillActions.addAction(action)
         self.deleteButton = MiniButton(root+'/../../styles/assets/icons/close.png',
                                          parent = self)
         self.hideButton = MiniButton(root+'/../../styles/assets/icons/eye.png',
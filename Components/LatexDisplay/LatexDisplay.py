@@ -32,56 +32,27 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
 
+from Components.utils.LatexRenderer import latexRenderer
 
-class LatexDisplay(QWebEngineView):
-    pageSource = """
-                    <html style="max-height:60px; overflow:hidden;">
-                    <head>
-                        <meta charset="UTF-8">
-                        <script src="https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.5/MathJax.js?config=TeX-AMS-MML_HTMLorMML">
-                        MathJax.Hub.Config({
-                            extensions: ["tex2jax.js"],
-                            jax: ["input/TeX","output/HTML-CSS"],
-                            tex2jax: {inlineMath: [["$","$"],["\\(","\\)"]]}
-                        });
-                        </script>
+class LatexDisplay(QLabel):
+    """Shows typeset LaTeX, rendered by the shared LatexRenderer, as a pixmap."""
+    fontsize = 18
+    color = '#ffffff'
 
-                        <style>
-                        .center {
-                            margin: 0;
-                            position: absolute;
-                            top: 50%;
-                            left: 50%;
-                            -ms-transform: translate(-50%, -50%);
-                            transform: translate(-50%, -50%);
-                        }
-
-                        </style>
-                    </head>
-                    <body style="background-color: #31363b;">
-
-                        <script>
-                            function updateMathJax(TeX) {
-                                /// set up new mathjax div content
-                                document.getElementById("MathOutput").innerHTML = TeX;
-                                /// update new mathjax div content
-                                MathJax.Hub.Queue(["Typeset",MathJax.Hub,"MathOutput"]);
-                            }
-                        </script>
-
-                        <div class="center">
-                            <mathjax id="MathOutput" style="font-size:1.5em; color:#FFF">${}$</mathjax>
-                        </div>
-
-                    </body>
-                    </html>
-                    """
     def __init__(self, parent=None):
         super(LatexDisplay, self).__init__(parent)
-        self.page().setBackgroundColor(QColor('#31363b'))
+        self.latex = None
+        self.dpr = None
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("background-color: #31363b;")
         self.setMaximumHeight(80)
         self.setMinimumHeight(60)
-        self.setHtml(self.pageSource)
         self.setSizePolicy(QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred))
+
+    def setLatex(self, latex):
+        dpr = self.devicePixelRatioF()
+        if (latex, dpr) == (self.latex, self.dpr):
+            return
+        self.latex, self.dpr = latex, dpr
+        self.setPixmap(latexRenderer.render(latex, self.fontsize, self.color, dpr))
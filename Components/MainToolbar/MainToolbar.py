@@ -32,8 +32,6 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
 
 from Components.BigButton.BigButton import BigButton
 
@@ -50,6 +48,11 @@ class MainToolbar(QToolBar):
         self.addLayerButton = BigButton("add",
                                          parent = self,)
 
+        self.settingsButton.setMenu(QMenu(self.settingsButton))
+        # frame rate, paint and evaluation times drawn over the graph
+        self.hudAction = self.settingsButton.menu().addAction("Performance overlay")
+        self.hudAction.setCheckable(True)
+
         self.addWidget(self.saveButton)
         self.addWidget(self.settingsButton)
         self.addWidget(self.addLayerButton)
@@ -0,0 +1,162 @@
+import time
+
+import numpy as np
+
+import pyqtgraph.opengl as gl
+import OpenGL.GL as ogl
+
+from PyQt5.QtGui import (QColor, QFont, QFontMetrics, QImage, QPainter)
+from PyQt5.QtCore import QTimer
+
+from Components.utils.Profiler import profiler
+
+
+class PerformanceHUD(gl.GLGraphicsItem.GLGraphicsItem):
+    """
+    Overlay in the corner of a GraphView showing the frame rate, the paint
+    time of the GL items, and per surface its vertex count, last evaluation
+    time and the memory held by its arrays.
+
+    The text is rendered into a texture twice a second (every refreshInterval
+    ms) and drawn as a single quad in between, so the overlay hardly adds to
+    what it measures. Paint times come from the profiler, which is switched on
+    while the overlay is shown.
+    """
+    refreshInterval = 500
+    # paint times are averaged over this many of the latest frames
+    paintSamples = 10
+
+    def __init__(self, owner):
+        gl.GLGraphicsItem.GLGraphicsItem.__init__(self)
+        self.owner = owner
+        self.font = QFont('Monospace', 9)
+        self.font.setStyleHint(QFont.TypeWriter)
+
+        self.image = None
+        self.texture = None
+        self.textureDirty = False
+
+        # drawn after (over) everything else
+        self.setDepthValue(1e6)
+        self.setVisible(False)
+
+        self.lastFrames = 0
+        self.lastTime = time.perf_counter()
+        self.wasProfiling = profiler.enabled
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def setActive(self, active):
+        if active == self.visible():
+            return
+        if active:
+            self.wasProfiling = profiler.enabled
+            profiler.enabled = True
+            self.lastFrames = self.owner.framesRendered
+            self.lastTime = time.perf_counter()
+            self.timer.start(self.refreshInterval)
+            self.refresh()
+        else:
+            profiler.enabled = self.wasProfiling
+            self.timer.stop()
+        self.setVisible(active)
+
+    def paintTime(self, name):
+        durations = profiler.durations(name, 'paint')[-self.paintSamples:]
+        return "{:6.2f} ms".format(np.mean(durations)) if durations else "     - ms"
+
+    def lines(self):
+        now = time.perf_counter()
+        frames = self.owner.framesRendered
+        fps = (frames - self.lastFrames)/max(now - self.lastTime, 1e-9)
+        self.lastFrames, self.lastTime = frames, now
+
+        lines = ["{:5.1f} fps   frames {} rendered / {} requested".format(
+                     fps, self.owner.framesRendered, self.owner.framesRequested),
+                 "axis    paint {}".format(self.paintTime('axis')),
+                 "labels  paint {}".format(self.paintTime('labels'))]
+        total = 0
+        for i, (name, surface) in enumerate(self.owner.data.items()):
+            backend, ms = self.owner.evaluator.timings.get(name, (surface.backend, None))
+            memory = surface.memoryUsage()
+            total += sum(memory.values())
+            lines.append("surface {}  paint {}  {:>9,} vertexes  eval {}".format(
+                i + 1, self.paintTime(name), surface.vertexCount(),
+                "-" if ms is None else "{:.1f} ms ({})".format(ms, backend)))
+            lines.append("          " + "  ".join("{} {:.2f} MB".format(key, size/2**20)
+                                                  for key, size in memory.items()))
+        lines.append("surfaces hold {:.2f} MB".format(total/2**20))
+        return lines
+
+    def refresh(self):
+        '''Renders the current numbers into the overlay's image.
+        '''
+        lines = self.lines()
+        metrics = QFontMetrics(self.font)
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 12
+        height = metrics.lineSpacing()*len(lines) + 10
+
+        image = QImage(width, height, QImage.Format_RGBA8888)
+        image.fill(QColor(0, 0, 0, 160))
+        painter = QPainter(image)
+        painter.setFont(self.font)
+        painter.setPen(QColor(230, 230, 230))
+        for i, line in enumerate(lines):
+            painter.drawText(6, 5 + metrics.ascent() + i*metrics.lineSpacing(), line)
+        painter.end()
+
+        self.image = image
+        self.textureDirty = True
+        self.update()
+
+    def uploadTexture(self):
+        bits = self.image.constBits()
+        bits.setsize(self.image.byteCount())
+        if self.texture is None:
+            self.texture = ogl.glGenTextures(1)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER, ogl.GL_NEAREST)
+        ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MAG_FILTER, ogl.GL_NEAREST)
+        ogl.glPixelStorei(ogl.GL_UNPACK_ALIGNMENT, 4)
+        ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, ogl.GL_RGBA8, self.image.width(), self.image.height(), 0,
+                         ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE, np.frombuffer(bits, dtype=np.uint8))
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+        self.textureDirty = False
+
+    def paint(self):
+        if self.image is None or self.view() is None:
+            return
+        if self.textureDirty:
+            self.uploadTexture()
+
+        # in window pixels, top left corner
+        ogl.glMatrixMode(ogl.GL_PROJECTION)
+        ogl.glPushMatrix()
+        ogl.glLoadIdentity()
+        ogl.glOrtho(0, self.view().width(), self.view().height(), 0, -1, 1)
+        ogl.glMatrixMode(ogl.GL_MODELVIEW)
+        ogl.glPushMatrix()
+        ogl.glLoadIdentity()
+        # the items drawn after this one get the view's depth test and blending back
+        ogl.glPushAttrib(ogl.GL_ENABLE_BIT | ogl.GL_COLOR_BUFFER_BIT | ogl.GL_TEXTURE_BIT)
+        ogl.glDisable(ogl.GL_DEPTH_TEST)
+        ogl.glEnable(ogl.GL_BLEND)
+        ogl.glBlendFunc(ogl.GL_SRC_ALPHA, ogl.GL_ONE_MINUS_SRC_ALPHA)
+        ogl.glEnable(ogl.GL_TEXTURE_2D)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture)
+        try:
+            x, y, w, h = 8, 8, self.image.width(), self.image.height()
+            ogl.glColor4f(1, 1, 1, 1)
+            ogl.glBegin(ogl.GL_QUADS)
+            ogl.glTexCoord2f(0, 0); ogl.glVertex2f(x, y)
+            ogl.glTexCoord2f(1, 0); ogl.glVertex2f(x + w, y)
+            ogl.glTexCoord2f(1, 1); ogl.glVertex2f(x + w, y + h)
+            ogl.glTexCoord2f(0, 1); ogl.glVertex2f(x, y + h)
+            ogl.glEnd()
+        finally:
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+            ogl.glPopAttrib()
+            ogl.glMatrixMode(ogl.GL_PROJECTION)
+            ogl.glPopMatrix()
+            ogl.glMatrixMode(ogl.GL_MODELVIEW)
+            ogl.glPopMatrix()
@@ -5,6 +5,7 @@ import random
 
 import scipy.interpolate
 from scipy.interpolate import griddata
+from scipy.ndimage import binary_dilation, distance_transform_edt
 
 from cytoolz import curry
 
@@ -32,32 +33,65 @@ from PyQt5.QtWidgets import (QApplication, QGridLayout, QHBoxLayout, QLayout, QL
                              QToolBox, QWidget, QPushButton, QFrame, QGraphicsOpacityEffect,
                              QMenu, QVBoxLayout, QScrollArea, QWidgetAction)
 
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+from Components.utils.AdaptiveSampler import AdaptiveSampler
+from Components.utils.ColormapLUT import colormapLUT
+from Components.utils.HeightColormapShader import heightColormapShader
+from Components.utils.GridSurfaceRenderer import GridSurfaceRenderer
+from Components.utils.Profiler import profiler
 
 class SurfacePlot(gl.GLSurfacePlotItem):
-    def __init__(self, resolution, owner, parent=None):
+    # grids with at least this many points per side are drawn coarse-to-fine,
+    # starting from every previewStride-th point
+    progressiveThreshold = 200
+    previewStride = 8
+
+    def __init__(self, name, resolution, owner, parent=None):
         super(SurfacePlot, self).__init__(smooth=True, shader='shaded',
                                           drawEdges=True, drawFaces=True,
                                           edgeColor=(0.3, 0.3, 0.3, 0.1))
+        self.name = name
         self.owner = owner
         self.resolution = resolution
+        self.extent = resolution # half-width of the plotted surface in scene units
 
-        # variable for storing current equation
+        # variable for storing current equation, and the sympy expression it was compiled from
         self.equation = None
+        self.expression = None
+
+        # one of EvaluationBackends.backends, the expression is compiled with it before evaluation
+        self.backend = 'numpy'
+
+        # 'uniform' samples the equation on the grid below, 'adaptive' on a quadtree
+        self.samplingMode = 'uniform'
+
+        # undefined points are either filled in ('fill') or left as holes ('holes'), see validateData
+        self.fillMode = 'fill'
+
+        # draws the uniform grid; adaptive meshes are drawn by GLMeshItem (see paint)
+        self.renderer = GridSurfaceRenderer(name)
+
+        # 'vertex' colors the surface with per-vertex colors computed here, 'shader'
+        # colors it by height on the GPU with the shared heightColormapShader,
+        # mapping zrange onto the colormap
+        self.colorMode = 'vertex'
+        self.zrange = [0., 1.]
 
-        # set default colormap
+        # set default colormap; colorIndices caches (zs, colormap indices of zs)
+        self.colorIndices = None
         self.setColormap("inferno")
 
-        # generate default graph data
-        self.xs, self.ys = np.mgrid[-self.owner.xrange:self.owner.xrange:int(2*self.resolution + 1)*1j,
-                                    -self.owner.yrange:self.owner.yrange:int(2*self.resolution + 1)*1j]
+        # generate default graph data; xs is a column and ys a row (an open grid),
+        # equations broadcast them to the full grid only where x and y meet
+        with profiler.span('grid', self.name):
+            self.xs, self.ys = np.ogrid[-self.owner.xrange:self.owner.xrange:int(2*self.resolution + 1)*1j,
+                                        -self.owner.yrange:self.owner.yrange:int(2*self.resolution + 1)*1j]
         self.updatePlot()
 
         # align the plotted data to the center of the graph
-        self.translate(-self.resolution,-self.resolution,0)
+        self.translate(-self.extent,-self.extent,0)
 
         # graph aesthetics
-        self.setData(z = np.zeros(shape=self.xs.shape))
+        self.displayData(np.zeros(shape=self.gridShape()))
         self.applyColormap()
 
         self.setShader('shaded')
@@ -66,56 +100,255 @@ class SurfacePlot(gl.GLSurfacePlotItem):
     def setColormap(self, cmap_name):
         self.cmap_name=(cmap_name)
         self.cmap = cm.get_cmap(cmap_name)
+        if self.colorMode == 'shader':
+            # only the texture changes
+            self.update()
+            return
         try:
             self.applyColormap()
         except:
             pass
 
     def applyColormap(self):
-        if not (self.zs.max() - self.zs.min()) == 0:
-            self.colors = self.cmap((self.zs - self.zs.min())/(self.zs.max() - self.zs.min()))
-        else:
-            self.colors = self.cmap(self.zs)
+        with profiler.span('applyColormap', self.name, colorMode=self.colorMode):
+            if self.colorMode == 'shader':
+                # colored on the GPU, only the height range has to be passed on
+                self.zrange = heightColormapShader.heightRange(self.zs)
+                self.setColors(None)
+                return
+            # the colormap indices only change with the data, so switching colormaps
+            # is a table lookup into the current color buffer
+            if self.colorIndices is None or self.colorIndices[0] is not self.zs:
+                self.colorIndices = (self.zs, colormapLUT.indices(self.zs))
+            self.setColors(colormapLUT.colorize(self.colorIndices[1], self.cmap_name,
+                                                out=getattr(self, 'colors', None),
+                                                dtype=np.uint8 if self.showingGrid() else np.float32))
+
+    def setColors(self, colors):
+        '''Sets the vertex colors of the grid or adaptive mesh currently shown.
+        '''
+        self.colors = colors
+        if self.showingGrid():
+            self.renderer.setColors(colors)
+        self.update()
+
+    @staticmethod
+    def colormapData(zs, cmap_name, dtype=np.float32):
+        '''Returns the RGBA vertex colors of *zs* under the colormap *cmap_name*,
+           float32 or uint8. Safe to call from worker threads.
+        '''
+        return colormapLUT.apply(zs, cmap_name, dtype=dtype)
 
     def updateResolution(self, new_resolution):
         self.resolution = new_resolution
-        self.xs, self.ys = np.mgrid[-self.owner.xrange:self.owner.xrange:int(20*self.resolution + 1)*1j,
-                                    -self.owner.yrange:self.owner.yrange:int(20*self.resolution + 1)*1j]
+        with profiler.span('grid', self.name):
+            self.xs, self.ys = np.ogrid[-self.owner.xrange:self.owner.xrange:int(20*self.resolution + 1)*1j,
+                                        -self.owner.yrange:self.owner.yrange:int(20*self.resolution + 1)*1j]
         self.updatePlot()
 
     def updatePlot(self):
         if self.equation == None:
-            self.zs = np.zeros(self.xs.shape)
-            self.setData(z = self.zs)
+            # anything still being evaluated for this surface is now out of date
+            self.owner.evaluator.cancel(self.name)
+            self.zs = np.zeros(self.gridShape())
+            self.displayData(self.zs)
+            self.applyColormap()
         else:
-            self.zs = self.equation(self.xs, self.ys)
-            if np.isscalar(self.zs):
-                self.zs = np.full(self.xs.shape, self.zs)
-                self.setData(z = self.zs)
-            else:
-                self.zs = self.validateData(self.zs)
-                self.setData(z = self.zs)
+            # evaluated off the GUI thread; see receiveData
+            self.owner.evaluator.submit(self.name)
+
+    def gridShape(self):
+        return (self.xs.shape[0], self.ys.shape[1])
+
+    def refinementStrides(self):
+        '''Returns the grid strides to evaluate, coarsest first. Each stride is half
+           of the one before it, so every level contains all points of the previous one.
+        '''
+        nx, ny = self.gridShape()[0] - 1, self.gridShape()[1] - 1
+        if min(nx, ny) + 1 < self.progressiveThreshold:
+            return [1]
+        stride = self.previewStride
+        while nx % stride or ny % stride:
+            stride //= 2
+        strides = []
+        while stride >= 1:
+            strides.append(stride)
+            stride //= 2
+        return strides
+
+    def setBackend(self, backend):
+        self.backend = backend
+        if self.expression is not None:
+            self.updatePlot()
+
+    def setSamplingMode(self, mode):
+        self.samplingMode = mode
+        self.updatePlot()
+
+    def setColorMode(self, mode):
+        self.colorMode = mode
+        self.setShader(heightColormapShader if mode == 'shader' else 'shaded')
         self.applyColormap()
 
-    def validateData(self, zs):
-        '''Checks for invalid values (np.nan or np.inf) and
-           replaces them with interpolated numeric values.
+    def setFillMode(self, mode):
+        self.fillMode = mode
+        if self.expression is not None:
+            self.updatePlot()
+
+    def adaptiveSampler(self):
+        '''Returns a sampler whose finest cells are twice as fine as the uniform grid,
+           allowed a quarter of its function evaluations.
         '''
-        #TODO: Fix for sparse marices / large undefined areas
-        if (not np.isnan(zs.flatten()).any(0)) and (not np.isinf(zs.flatten()).any(0)):
-            return zs
+        budget = self.xs.size*self.ys.size//4
+        # the base grid, its cells' corners and centers, takes at most half the budget
+        baseCells = 16
+        while baseCells > 2 and (baseCells + 1)**2 + baseCells**2 > budget//2:
+            baseCells -= 1
+        depth = int(np.ceil(np.log2(max(2*(max(self.gridShape()) - 1)/baseCells, 1))))
+        return AdaptiveSampler(self.owner.xrange, self.owner.yrange,
+                               budget=budget, baseCells=baseCells, maxDepth=depth)
+
+    def showingGrid(self):
+        '''True while the uniform grid is shown rather than an adaptive mesh.
+        '''
+        return self.opts['meshdata'] is self._meshdata
+
+    def displayData(self, zs, stride=1):
+        '''Shows *zs*, sampled at every *stride*-th point of the grid, over the
+           full extent of the surface. Undefined points (the 'holes' fillMode)
+           are left out of the mesh.
+        '''
+        if not self.showingGrid():
+            # switching back from an adaptive mesh
+            self.setMeshData(meshdata=self._meshdata)
+            self.renderer.setColors(self.colors)
+        x = np.linspace(0, 2*self.extent, self.xs.shape[0])[::stride]
+        y = np.linspace(0, 2*self.extent, self.ys.shape[1])[::stride]
+        # the renderer only streams the new heights and normals into its buffers
+        with profiler.span('setData', self.name, stride=stride):
+            self.renderer.setData(x, y, zs)
+        self.update()
+
+    def vertexCount(self):
+        if not self.showingGrid():
+            return len(self.opts['meshdata'].vertexes())
+        return 0 if self.renderer.shape is None else self.renderer.shape[0]*self.renderer.shape[1]
+
+    def memoryUsage(self):
+        '''Returns the bytes held by the grid, height and color arrays.
+        '''
+        return {name: getattr(getattr(self, name, None), 'nbytes', 0)
+                for name in ('xs', 'ys', 'zs', 'colors')}
+
+    def paint(self):
+        with profiler.span('paint', self.name):
+            if self.colorMode == 'shader':
+                heightColormapShader.prepare(self.cmap_name, self.zrange)
+            if not self.showingGrid():
+                return super(SurfacePlot, self).paint()
+            self.setupGLState()
+            # coarser, without edges, while the camera is being moved
+            self.renderer.paint(self, self.owner.interactionPoints if self.owner.interacting else None)
+
+    def receiveData(self, zs, colors, cmap_name, stride=1):
+        '''Displays a finished evaluation (or one refinement level of it) handed
+           back by the GraphView's SurfaceEvaluator.
+        '''
+        self.zs = zs
+        self.displayData(self.zs, stride)
+        if cmap_name == self.cmap_name and self.colorMode == 'vertex' and colors is not None:
+            self.setColors(colors)
+        else:
+            # the colormap (or color mode) was changed while the job was running
+            self.applyColormap()
+
+    def receiveMesh(self, vertexes, faces, colors, cmap_name):
+        '''Displays an adaptively sampled, triangulated surface handed back by the
+           GraphView's SurfaceEvaluator.
+        '''
+        # map x, y from graph coordinates onto the same frame as the uniform grid
+        vertexes[:, 0] = (vertexes[:, 0] + self.owner.xrange)*self.extent/self.owner.xrange
+        vertexes[:, 1] = (vertexes[:, 1] + self.owner.yrange)*self.extent/self.owner.yrange
+        self.zs = vertexes[:, 2]
+        self.setMeshData(vertexes=vertexes, faces=faces)
+        if cmap_name == self.cmap_name and self.colorMode == 'vertex' and colors is not None:
+            self.setColors(colors)
         else:
-            # integer arrays for indexing
-            x_indx, y_indx = np.meshgrid(np.arange(0, zs.shape[1]),
-                                         np.arange(0, zs.shape[0]))
-            # mask all invalid values
-            zs_masked = np.ma.masked_invalid(zs)
-            # retrieve the valid, non-Nan, defined values
-            valid_xs = x_indx[~zs_masked.mask]
-            valid_ys = y_indx[~zs_masked.mask]
-            valid_zs = zs_masked[~zs_masked.mask]
-            # generate interpolated array of z-values
-            zs_interp = scipy.interpolate.griddata((valid_xs, valid_ys), valid_zs.ravel(),
-                                             (x_indx, y_indx), method='cubic')
-            # finally, return the data
-            return zs_interp
+            self.applyColormap()
+
+    @staticmethod
+    def validateData(zs, fillMode='fill'):
+        '''Checks for invalid values (np.nan or np.inf). With the 'fill' fillMode
+           they are replaced by values inpainted from the valid ones around them,
+           with 'holes' they are all turned into np.nan and left out of the mesh
+           by displayData. Safe to call from worker threads.
+        '''
+        invalid = ~np.isfinite(zs)
+        if not invalid.any():
+            return zs
+        zs = np.where(invalid, np.nan, zs)
+        if fillMode == 'holes':
+            return zs
+        if invalid.all():
+            return np.zeros(zs.shape)
+        return SurfacePlot.inpaintData(zs, invalid)
+
+    # rings of points inpaintData averages before it falls back to copying the nearest value
+    inpaintRings = 8
+    # offsets of the 8 neighbours of a grid point
+    neighbourOffsets = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+    @staticmethod
+    def inpaintData(zs, invalid):
+        '''Fills the *invalid* points of *zs* (in place) from the outside in: each
+           pass sets the points bordering the known ones to the mean of their known
+           neighbours. These passes only visit the invalid points and their
+           neighbours.
+
+           Past the first inpaintRings rings the remaining points just take the
+           value of the nearest known point (one distance transform), which keeps
+           large undefined areas, like log(x) on half of the grid, fast.
+
+           Everything but finding them works on the bounding box of the invalid
+           points and the ring around it, so the cost grows with that box: a few
+           stray points are cheap, while undefined points on opposite sides of
+           the grid cost a distance transform of the whole grid.
+        '''
+        rowsWith, colsWith = np.flatnonzero(invalid.any(axis=1)), np.flatnonzero(invalid.any(axis=0))
+        # every point just outside the box is known, so the nearest known point is inside it
+        window = (slice(max(rowsWith[0] - 1, 0), rowsWith[-1] + 2),
+                  slice(max(colsWith[0] - 1, 0), colsWith[-1] + 2))
+        box, invalid = zs[window].copy(), invalid[window]
+
+        rows, cols = box.shape
+        values = box.reshape(-1)
+        known = ~invalid.reshape(-1)
+        frontier = np.flatnonzero(invalid & binary_dilation(~invalid, structure=np.ones((3, 3), dtype=bool)))
+
+        for ring in range(SurfacePlot.inpaintRings):
+            if not frontier.size:
+                break
+            r, c = np.divmod(frontier, cols)
+            total = np.zeros(frontier.size)
+            count = np.zeros(frontier.size)
+            unknown = []
+            for dr, dc in SurfacePlot.neighbourOffsets:
+                rr, cc = r + dr, c + dc
+                inside = (rr >= 0) & (rr < rows) & (cc >= 0) & (cc < cols)
+                index = np.where(inside, rr*cols + cc, 0)
+                use = inside & known[index]
+                total += np.where(use, values[index], 0)
+                count += use
+                unknown.append(index[inside & ~use])
+            values[frontier] = total/count
+            known[frontier] = True
+            # the next ring: neighbours of this one that are still unknown
+            frontier = np.unique(np.concatenate(unknown))
+            frontier = frontier[~known[frontier]]
+
+        if frontier.size:
+            unknown = ~known.reshape(rows, cols)
+            nearest = distance_transform_edt(unknown, return_distances=False, return_indices=True)
+            box[unknown] = box[nearest[0][unknown], nearest[1][unknown]]
+        zs[window] = box
+        return zs
@@ -0,0 +1,202 @@
+import numpy as np
+
+
+class AdaptiveSampler():
+    """
+    Samples z = f(x, y) on a quadtree over [-xrange, xrange] x [-yrange, yrange]
+    instead of a uniform grid.
+
+    Starting from a coarse grid of cells, a cell is split into four whenever the
+    function at its center deviates from the bilinear interpolation of its
+    corners by more than *tolerance* (relative to the height of the surface),
+    or when it straddles the edge of the function's domain. The worst cells are
+    split first until nothing exceeds the tolerance, the cells reach
+    *maxDepth* or the next split would take more than *budget* function
+    evaluations in total. Only the base grid may exceed the budget.
+
+    Samples are stored in a dense array over the integer lattice, so corners
+    shared between cells are evaluated only once, and every round of splits is
+    evaluated in one vectorized call. Each cell's error is computed once, when
+    it is created.
+
+    The resulting leaf cells are triangulated as fans around their centers, so
+    samples left on a cell's edges by finer neighbours are joined without cracks.
+    """
+    def __init__(self, xrange, yrange, budget=20000, baseCells=16, maxDepth=5, tolerance=0.002):
+        self.xrange = xrange
+        self.yrange = yrange
+        self.budget = budget
+        self.baseCells = baseCells
+        self.maxDepth = maxDepth
+        self.tolerance = tolerance
+
+        # lattice points per side
+        self.latticeSize = baseCells * 2**maxDepth
+        self.values = None
+        self.sampled = None
+        # scratch space, one int per lattice point
+        self.slots = None
+        self.evaluations = 0
+
+    def sample(self, equation, isStale=lambda: False):
+        """
+        Returns ``(vertexes, faces)``: an (N, 3) array of x, y, z samples and the
+        (M, 3) triangles between them. Triangles touching undefined values are
+        left out. Returns None if *isStale* reports that the work is no longer needed.
+        """
+        # z at each lattice point, NaN where it hasn't been sampled
+        self.values = np.full((self.latticeSize + 1, self.latticeSize + 1), np.nan)
+        self.sampled = np.zeros(self.values.shape, dtype=bool)
+        self.slots = np.empty(self.values.shape, dtype=np.int32)
+        self.evaluations = 0
+
+        size = 2**self.maxDepth
+        ii, jj = np.mgrid[0:self.baseCells, 0:self.baseCells]
+        cells = np.stack([ii.ravel()*size, jj.ravel()*size, np.full(ii.size, size)], axis=1)
+        self.fetch(equation, cells)
+
+        finite = self.values[self.sampled & np.isfinite(self.values)]
+        tolerance = self.tolerance * (finite.max() - finite.min()) if finite.size else 0
+        errors = self.cellErrors(cells)
+        leaves = []
+
+        while True:
+            if isStale():
+                return None
+            splittable = (errors > tolerance) & (cells[:, 2] > 1)
+            leaves.append(cells[~splittable])
+            order = np.flatnonzero(splittable)
+            order = order[np.argsort(-errors[order], kind='stable')]
+            cells, errors = cells[order], errors[order]
+            if len(cells) == 0:
+                break
+
+            # split the worst cells whose new samples still fit in the budget;
+            # counted per cell, so samples shared between them only make it cheaper
+            remaining = self.budget - self.evaluations
+            if 8*len(cells) <= remaining:
+                count = len(cells)
+            else:
+                count = np.searchsorted(np.cumsum(self.splitCost(cells)), remaining, side='right')
+            if count == 0:
+                leaves.append(cells)
+                break
+
+            children = self.split(cells[:count])
+            self.fetch(equation, children)
+            cells = np.concatenate([cells[count:], children])
+            errors = np.concatenate([errors[count:], self.cellErrors(children)])
+
+        return self.mesh(np.concatenate(leaves))
+
+    def corners(self, cells):
+        i, j, s = cells.T
+        return [(i, j), (i + s, j), (i, j + s), (i + s, j + s)]
+
+    def centers(self, cells):
+        i, j, s = cells.T
+        return (i + s//2, j + s//2)
+
+    def split(self, cells):
+        i, j, s = cells.T
+        h = s//2
+        return np.concatenate([np.stack([i,     j,     h], axis=1),
+                               np.stack([i + h, j,     h], axis=1),
+                               np.stack([i,     j + h, h], axis=1),
+                               np.stack([i + h, j + h, h], axis=1)])
+
+    def splitCost(self, cells):
+        '''Number of samples splitting each of *cells* would add: the midpoints
+           of its edges and the centers of its children that aren't sampled yet.
+        '''
+        i, j, s = cells.T
+        h, q = s//2, s//4
+        i = np.stack([i + h, i,     i + s, i + h, i + q, i + h + q, i + q,     i + h + q])
+        j = np.stack([j,     j + h, j + h, j + s, j + q, j + q,     j + h + q, j + h + q])
+        return (~self.sampled[i, j]).sum(axis=0)
+
+    def fetch(self, equation, cells):
+        '''Evaluates the corners and centers of *cells* that haven't been sampled yet.
+        '''
+        points = self.corners(cells) + [self.centers(cells)]
+        i = np.concatenate([p[0] for p in points])
+        j = np.concatenate([p[1] for p in points])
+        new = ~self.sampled[i, j]
+        i, j = i[new], j[new]
+        # cells share points: keep the occurrence of each whose position was written last
+        order = np.arange(len(i), dtype=np.int32)
+        self.slots[i, j] = order
+        first = self.slots[i, j] == order
+        i, j = i[first], j[first]
+        if len(i) == 0:
+            return
+
+        xs = -self.xrange + 2*self.xrange*i/self.latticeSize
+        ys = -self.yrange + 2*self.yrange*j/self.latticeSize
+        self.values[i, j] = np.broadcast_to(equation(xs, ys), xs.shape)
+        self.sampled[i, j] = True
+        self.evaluations += len(i)
+
+    def cellErrors(self, cells):
+        '''Deviation of each cell's center from the bilinear interpolation of its
+           corners. Cells that are only partly defined get an infinite error.
+        '''
+        corners = np.stack([self.values[c] for c in self.corners(cells)])
+        center = self.values[self.centers(cells)]
+        samples = np.vstack([corners, center])
+
+        defined = np.isfinite(samples)
+        errors = np.zeros(len(cells))
+        complete = defined.all(axis=0)
+        errors[complete] = np.abs(center[complete] - corners[:, complete].mean(axis=0))
+        errors[defined.any(axis=0) & ~complete] = np.inf
+        return errors
+
+    def fans(self, cells, size):
+        '''Triangles, as flat lattice indexes, covering the leaf *cells* of *size*.
+           Wound clockwise in (i, j) like the uniform grid's gridFaces.
+        '''
+        n = self.latticeSize + 1
+        i, j = cells[:, 0]*n, cells[:, 1]
+        if size == 1:
+            # nothing can lie on the edges, two triangles as in gridFaces
+            a, b, c, d = i + j, i + j + 1, i + n + j + 1, i + n + j
+            return np.concatenate([np.stack([a, b, d], axis=1), np.stack([d, b, c], axis=1)])
+
+        # the lattice points around each cell, clockwise from its first corner
+        k = np.arange(size)
+        di = np.concatenate([0*k, k, size + 0*k, size - k])
+        dj = np.concatenate([k, size + 0*k, size - k, 0*k])
+        boundary = (i[:, None] + di*n) + (j[:, None] + dj)
+        sampled = self.sampled.ravel()[boundary]
+
+        # join each sampled boundary point to the next one around the same cell
+        positions = np.flatnonzero(sampled)
+        rows = positions // boundary.shape[1]
+        points = boundary.ravel()[positions]
+        following = np.roll(points, -1)
+        first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        following[np.r_[first[1:], len(points)] - 1] = points[first]
+
+        centers = i + size//2*n + j + size//2
+        return np.stack([centers[rows], points, following], axis=1)
+
+    def mesh(self, leaves):
+        points = np.flatnonzero(self.sampled)
+        zs = self.values.ravel()[points]
+        valid = np.isfinite(zs)
+        points, zs = points[valid], zs[valid]
+
+        # number the defined samples, and drop the triangles touching any other point
+        index = self.slots.ravel()
+        index[:] = -1
+        index[points] = np.arange(len(points), dtype=np.int32)
+        faces = index[np.concatenate([self.fans(leaves[leaves[:, 2] == size], size)
+                                      for size in np.unique(leaves[:, 2])])]
+        faces = faces[(faces >= 0).all(axis=1)]
+
+        i, j = np.divmod(points, self.latticeSize + 1)
+        vertexes = np.column_stack([-self.xrange + 2*self.xrange*i/self.latticeSize,
+                                    -self.yrange + 2*self.yrange*j/self.latticeSize,
+                                    zs])
+        return vertexes, faces.astype(np.uint32)
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+
+import matplotlib
+
+
+class ColormapLUT():
+    """
+    Maps height data to RGBA vertex colors through a precomputed lookup table
+    of *size* entries per colormap, instead of evaluating the matplotlib
+    colormap (in float64) on every point.
+
+    Tables are built once per (colormap name, dtype) and shared; the last
+    entry of each holds the colormap's "bad" color, used for undefined
+    heights. Colors come out as float32 (values in [0, 1]) or uint8 (0-255).
+    """
+    # heights reduced at once by bounds(), small enough to stay in cache
+    block = 65536
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, cmap_name, dtype=np.float32):
+        key = (cmap_name, np.dtype(dtype))
+        with self.lock:
+            table = self.tables.get(key)
+        if table is None:
+            cmap = matplotlib.colormaps[cmap_name]
+            rgba = np.vstack([cmap(np.linspace(0, 1, self.size)), cmap(np.nan)])
+            if np.dtype(dtype) == np.uint8:
+                table = np.rint(rgba*255).astype(np.uint8)
+            else:
+                table = rgba.astype(dtype)
+            with self.lock:
+                self.tables[key] = table
+        return table
+
+    def bounds(self, zs):
+        '''Returns ``(lo, hi, undefined)``: the range of the finite heights in
+           *zs* (``(inf, -inf)`` if there are none) and whether any aren't finite.
+
+           Both bounds come from one pass over memory: *zs* is reduced a block
+           at a time, and each block is still in cache when its max is taken
+           after its min. Only blocks holding undefined heights are masked.
+        '''
+        flat = np.ravel(zs)
+        lo, hi, undefined = np.inf, -np.inf, False
+        for start in range(0, flat.size, self.block):
+            block = flat[start:start + self.block]
+            blockLo, blockHi = block.min(), block.max()
+            if not (np.isfinite(blockLo) and np.isfinite(blockHi)):
+                undefined = True
+                block = block[np.isfinite(block)]
+                if block.size == 0:
+                    continue
+                blockLo, blockHi = block.min(), block.max()
+            lo, hi = min(lo, blockLo), max(hi, blockHi)
+        return lo, hi, undefined
+
+    def indices(self, zs):
+        '''Returns the table index of every height, normalized over the range of
+           the defined heights. Recoloring the same data with another colormap
+           only needs these.
+        '''
+        lo, hi, undefined = self.bounds(zs)
+        if lo > hi:
+            return np.full(zs.shape, self.size, dtype=np.int32)
+
+        scaled = np.subtract(zs, lo, dtype=np.float64)
+        if hi > lo:
+            scaled *= (self.size - 1)/(hi - lo)
+        else:
+            scaled[...] = 0
+        if undefined:
+            scaled[~np.isfinite(zs)] = self.size
+        np.rint(scaled, out=scaled)
+        return scaled.astype(np.int32)
+
+    def colorize(self, indices, cmap_name, out=None, dtype=np.float32):
+        '''Returns the colors at *indices* (see indices()) of the colormap
+           *cmap_name*, shaped ``indices.shape + (4,)``. They are written into *out*
+           when it is a contiguous array of that shape and *dtype*, so a caller
+           can keep reusing one buffer.
+        '''
+        table = self.table(cmap_name, dtype)
+        shape = tuple(indices.shape) + (4,)
+        if (out is None or out.shape != shape or out.dtype != table.dtype
+                or not out.flags.c_contiguous):
+            out = np.empty(shape, dtype=table.dtype)
+        # look up whole RGBA entries at once, as single 4 or 16 byte items
+        item = {1: np.uint32, 4: np.complex128}[table.dtype.itemsize]
+        np.take(table.view(item).reshape(-1), indices.reshape(-1), out=out.view(item).reshape(-1))
+        return out
+
+    def apply(self, zs, cmap_name, out=None, dtype=np.float32):
+        '''Returns the colors of *zs* under the colormap *cmap_name*, see colorize().
+        '''
+        return self.colorize(self.indices(zs), cmap_name, out, dtype)
+
+
+# shared by every SurfacePlot
+colormapLUT = ColormapLUT()
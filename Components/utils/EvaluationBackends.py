@@ -0,0 +1,237 @@
+import os
+import sys
+import hashlib
+import importlib
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+import sympy as sy
+from sympy import lambdify
+from sympy.printing.pycode import PythonCodePrinter
+from sympy.printing.numpy import NumPyPrinter
+
+
+# where generated sources and numba's compiled machine code are kept between sessions
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".3DGrapher", "cache")
+
+backends = ['numpy', 'numexpr', 'numba']
+
+
+# numexpr and numba are optional, and only imported once they are asked for
+# (worker processes need a chance to limit their thread counts first)
+def _numexpr():
+    try:
+        import numexpr
+        return numexpr
+    except ImportError:
+        return None
+
+def _numba():
+    try:
+        import numba
+        return numba
+    except ImportError:
+        return None
+
+def availableBackends():
+    return [b for b in backends if b == 'numpy'
+                                 or (b == 'numexpr' and _numexpr() is not None)
+                                 or (b == 'numba' and _numba() is not None)]
+
+
+@lru_cache(maxsize=256)
+def compileExpression(expression, backend='numpy'):
+    """
+    Compiles a sympy expression of x and y into a vectorized callable.
+
+    Returns ``(function, backend)`` where *backend* is the one actually used:
+    expressions a backend can't handle (or a backend that isn't installed)
+    fall back to NumPy.
+    """
+    x, y = sy.symbols('x y')
+    probe = np.linspace(0.5, 1.5, 4)
+
+    if backend == 'numexpr' and _numexpr() is not None:
+        try:
+            # multithreaded, and without a full-grid temporary per subexpression
+            function = lambdify((x, y), expression, 'numexpr')
+            function(probe, probe)
+            return function, 'numexpr'
+        except Exception:
+            pass
+
+    if backend == 'numba' and _numba() is not None:
+        try:
+            function = _numbaFunction(expression)
+            function(probe, probe)
+            return function, 'numba'
+        except Exception:
+            pass
+
+    try:
+        function = _cseFunction(expression)
+        function(probe, probe)
+        return function, 'numpy'
+    except Exception:
+        return lambdify((x, y), expression), 'numpy'
+
+
+# sympy functions whose numpy ufunc maps a float array onto a float array, so
+# they can overwrite their argument
+_inplaceUfuncs = {'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+                  'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan',
+                  'sinh': 'sinh', 'cosh': 'cosh', 'tanh': 'tanh',
+                  'asinh': 'arcsinh', 'acosh': 'arccosh', 'atanh': 'arctanh',
+                  'exp': 'exp', 'log': 'log', 'Abs': 'absolute',
+                  'floor': 'floor', 'ceiling': 'ceil'}
+
+def _apply(ufunc, value, owned):
+    '''Applies *ufunc*, writing into *value* if it is a float array nobody else uses.
+    '''
+    if owned and isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+        return ufunc(value, out=value)
+    return ufunc(value)
+
+def _fold(ufunc, owned, *terms):
+    '''Combines *terms* left to right with *ufunc*. Once the running result is an
+       array of its own with the final shape and type every further term is
+       written into it instead of into a new temporary.
+    '''
+    result = terms[0]
+    for term in terms[1:]:
+        if (owned and isinstance(result, np.ndarray)
+                and np.broadcast(result, term).shape == result.shape
+                and np.result_type(result, term) == result.dtype):
+            ufunc(result, term, out=result)
+        else:
+            result = ufunc(result, term)
+            owned = True
+    return result
+
+
+_cseSource = """def function(x, y):
+{}
+"""
+
+def _cseFunction(expression):
+    '''Compiles *expression* into a numpy function that computes every repeated
+       subexpression once (``sympy.cse``).
+
+       Terms of sums and products that depend on only one of x and y are
+       combined first, so with open-grid arguments (a column of x and a row of y)
+       they are evaluated on the axes and only broadcast to the full grid where x
+       and y meet.
+
+       Sums, products and elementwise functions reuse the temporaries of their
+       arguments as output buffers, and the buffer of an intermediate is handed on
+       to the statement that uses it last, so a chain of operations doesn't
+       allocate a new full-size array at every step.
+    '''
+    x, y = sy.symbols('x y')
+    replacements, reduced = sy.cse(expression)
+    statements = replacements + [(None, reduced[0])]
+
+    # the statement after which each intermediate is no longer needed, and
+    # which of x and y each intermediate depends on
+    lastUse = {}
+    depends = {x: {x}, y: {y}}
+    for index, (symbol, value) in enumerate(statements):
+        for s in value.free_symbols:
+            lastUse[s] = index
+        if symbol is not None:
+            depends[symbol] = set().union(*(depends.get(s, set()) for s in value.free_symbols))
+
+    def variables(term):
+        return set().union(*(depends.get(s, set()) for s in term.free_symbols))
+
+    printer = NumPyPrinter({'strict': True})
+
+    def owned(term, index):
+        # the temporaries of arithmetic and of the ufuncs above are ours (some
+        # other numpy functions, like numpy.real, can return their argument), and
+        # so is an intermediate at its last use, as long as it isn't read again
+        # further along the same statement
+        if not isinstance(term, sy.Symbol):
+            return isinstance(term, (sy.Add, sy.Mul, sy.Pow)) or type(term).__name__ in _inplaceUfuncs
+        return (lastUse.get(term) == index and term not in (x, y)
+                and sum(1 for s in sy.preorder_traversal(statements[index][1]) if s == term) == 1)
+
+    def emit(value, index):
+        name = type(value).__name__
+        if name in _inplaceUfuncs and len(value.args) == 1:
+            argument = value.args[0]
+            return "_apply(numpy.{}, {}, {})".format(_inplaceUfuncs[name], printer.doprint(argument),
+                                                     owned(argument, index))
+        if isinstance(value, sy.Add) or (isinstance(value, sy.Mul) and not any(
+                a.is_Pow and a.exp.is_negative for a in value.args)):
+            ufunc = 'numpy.add' if isinstance(value, sy.Add) else 'numpy.multiply'
+            # x and y are an open grid, so terms of x alone (or y alone) are
+            # combined while they are still 1-D; the first full-size array is
+            # their outer sum or product, and the terms of both are folded into that
+            terms = []
+            for group in ([a for a in value.args if variables(a) <= {x}],
+                          [a for a in value.args if variables(a) == {y}]):
+                if len(group) > 1:
+                    terms.append(("_fold({}, {}, {})".format(ufunc, owned(group[0], index),
+                                                             ", ".join(printer.doprint(a) for a in group)), True))
+                elif group:
+                    terms.append((printer.doprint(group[0]), owned(group[0], index)))
+            terms += [(printer.doprint(a), owned(a, index)) for a in value.args if variables(a) == {x, y}]
+            return "_fold({}, {}, {})".format(ufunc, terms[0][1], ", ".join(code for code, _ in terms))
+        return printer.doprint(value)
+
+    lines = []
+    for index, (symbol, value) in enumerate(statements):
+        code = emit(value, index)
+        if symbol is None:
+            lines.append("return " + code)
+            break
+        lines.append("{} = {}".format(symbol, code))
+        dead = sorted((str(s) for s, i in lastUse.items() if i == index and s not in (x, y)))
+        if dead:
+            lines.append("del " + ", ".join(dead))
+
+    namespace = {'numpy': np, '_apply': _apply, '_fold': _fold}
+    exec(_cseSource.format("\n".join("    " + line for line in lines)), namespace)
+    return namespace['function']
+
+
+_numbaSource = """import math
+from numba import vectorize
+
+@vectorize(['float64(float64, float64)'], target='parallel', cache=True)
+def function(x, y):
+    return {}
+"""
+
+def _numbaFunction(expression):
+    '''Writes the expression out as a parallel numba ufunc in CACHE_DIR/numba so that
+       numba can keep the compiled code on disk; an expression seen in an earlier
+       session is loaded without compiling it again.
+
+       The module is imported by name from that directory, as numba's cache
+       needs to import it again when it loads the compiled code.
+    '''
+    printer = PythonCodePrinter({'fully_qualified_modules': True})
+    code = printer.doprint(expression)
+    if printer._not_supported:
+        raise ValueError("numba backend does not support {}".format(printer._not_supported))
+
+    source = _numbaSource.format(code)
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+    directory = os.path.join(CACHE_DIR, "numba")
+    path = os.path.join(directory, "expr_{}.py".format(digest))
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        # other jobs may be importing it meanwhile, so it appears all at once
+        handle, temporary = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        with os.fdopen(handle, 'w') as f:
+            f.write(source)
+        os.replace(temporary, path)
+        importlib.invalidate_caches()
+
+    if directory not in sys.path:
+        sys.path.append(directory)
+    return importlib.import_module("expr_{}".format(digest)).function
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+from sympy import sympify, latex
+
+from Components.utils.EvaluationBackends import compileExpression
+from Components.utils.Profiler import profiler
+
+
+class CompiledExpression():
+    """
+    The result of parsing one equation exactly once: the sympy expression, its
+    LaTeX and the NumPy callable of (x, y) used for plotting.
+
+    Input that fails to parse or evaluate is kept as well, with ``valid`` set to
+    False, so retyping a broken equation doesn't parse it again.
+    """
+    def __init__(self, text, simplify, numeric=None):
+        self.text = text
+        self.simplify = simplify
+        self.expression = None
+        self.function = None
+        self.latex = None
+        self.valid = False
+
+        try:
+            if numeric is not None and numeric.valid:
+                # the other simplify-flavour of this text already did the numeric work
+                self.expression, self.function = numeric.expression, numeric.function
+            else:
+                with profiler.span('sympify'):
+                    self.expression = sympify(text)
+                with profiler.span('lambdify'):
+                    self.function = compileExpression(self.expression)[0]
+                self.function(1, 1)
+            self.valid = True
+        except Exception:
+            return
+
+        try:
+            if simplify == True:
+                self.latex = latex(self.expression)
+            else:
+                self.latex = latex(sympify(text, evaluate=False))
+        except Exception as err:
+            print(err)
+
+
+class ExpressionCache():
+    """
+    Process-wide LRU cache of CompiledExpressions keyed on the normalized input
+    text and the simplify flag, shared by every stage of the equation pipeline
+    (validation, LaTeX display and plotting).
+
+    ``hits`` and ``misses`` count lookups so the effect on typing latency can be
+    checked.
+    """
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        '''Collapses runs of whitespace, which never change what sympify parses.
+        '''
+        return " ".join(text.split())
+
+    def lookup(self, text, simplify=False):
+        key = (self.normalize(text), bool(simplify))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            numeric = self.entries.get((key[0], not key[1]))
+
+        # parse outside of the lock, this is the slow part
+        entry = CompiledExpression(key[0], key[1], numeric=numeric)
+
+        with self.lock:
+            self.entries[key] = entry
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self.entries)}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# shared by every EquationTableItem
+expressionCache = ExpressionCache()
@@ -0,0 +1,62 @@
+from PyQt5.QtCore import (Qt, QFileInfo, QRect)
+from PyQt5.QtGui import (QBrush, QGuiApplication, QIcon, QImage, QPainter, QPixmap)
+
+
+class GradientIcons():
+    """
+    Hands out the circular colormap icons used by GradientIconButton and
+    MiniGradientButton.
+
+    Each icon is read from the gradients directory and masked once per
+    (colormap, size, device pixel ratio); every button showing it shares the
+    same QIcon.
+    """
+    def __init__(self):
+        self.directory = QFileInfo(__file__).absolutePath() + "/../../styles/assets/icons/gradients/"
+        # (gradient_name, size, dpr): QIcon
+        self.icons = {}
+
+    @staticmethod
+    def devicePixelRatio():
+        app = QGuiApplication.instance()
+        return app.devicePixelRatio() if app is not None else 1.0
+
+    def icon(self, gradient_name, size=35):
+        '''Returns the QIcon of *gradient_name*, *size* x *size* (logical) pixels.
+        '''
+        dpr = self.devicePixelRatio()
+        key = (gradient_name, size, dpr)
+        if key not in self.icons:
+            self.icons[key] = QIcon(self.pixmap(gradient_name, size, dpr))
+        return self.icons[key]
+
+    def pixmap(self, gradient_name, size, dpr):
+        '''Returns the colormap's icon masked with a smooth circle, as a QPixmap
+           of *size* x *size* pixels that is sharp at device pixel ratio *dpr*.
+        '''
+        image = QImage(self.directory + gradient_name + '.png')
+
+        # Crop image to a square:
+        imgsize = min(image.width(), image.height())
+        image = image.copy(QRect((image.width() - imgsize)//2, (image.height() - imgsize)//2,
+                                 imgsize, imgsize))
+
+        # paint a circle with the original image onto a transparent image
+        out_img = QImage(imgsize, imgsize, QImage.Format_ARGB32_Premultiplied)
+        out_img.fill(Qt.transparent)
+        painter = QPainter(out_img)
+        painter.setBrush(QBrush(image))
+        painter.setPen(Qt.NoPen)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.drawEllipse(0, 0, imgsize, imgsize)
+        painter.end()
+
+        # rescale in device pixels, so the icon is sharp on high-DPI screens
+        pixels = int(round(size*dpr))
+        pixmap = QPixmap.fromImage(out_img.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+
+# shared by every gradient button
+gradientIcons = GradientIcons()
@@ -0,0 +1,316 @@
+import numpy as np
+
+import OpenGL.GL as ogl
+from PyQt5.QtGui import QColor
+
+import pyqtgraph.functions as fn
+from pyqtgraph.opengl import shaders
+
+from Components.utils.Profiler import profiler
+
+
+def gridIndex(rows, cols, step=1):
+    '''Indexes of every *step*-th row and column of a rows x cols grid of
+       vertexes (stored row by row). The last row and column are always kept,
+       so a decimated grid covers the same extent as the full one.
+    '''
+    r = np.arange(0, rows, step, dtype=np.uint32)
+    c = np.arange(0, cols, step, dtype=np.uint32)
+    if r[-1] != rows - 1:
+        r = np.append(r, np.uint32(rows - 1))
+    if c[-1] != cols - 1:
+        c = np.append(c, np.uint32(cols - 1))
+    return r[:, None]*np.uint32(cols) + c[None, :]
+
+def gridFaces(rows, cols, step=1):
+    '''Triangles of a rows x cols grid of vertexes (stored row by row), two
+       per cell, in the same order GLSurfacePlotItem.generateFaces uses. With
+       *step* > 1 they only join every step-th vertex (see gridIndex).
+    '''
+    index = gridIndex(rows, cols, step)
+    faces = np.empty((index.shape[0] - 1, 2, index.shape[1] - 1, 3), dtype=np.uint32)
+    faces[:, 0, :, 0] = index[:-1, :-1]
+    faces[:, 0, :, 1] = index[:-1, 1:]
+    faces[:, 0, :, 2] = index[1:, :-1]
+    faces[:, 1, :, 0] = index[1:, :-1]
+    faces[:, 1, :, 1] = index[:-1, 1:]
+    faces[:, 1, :, 2] = index[1:, 1:]
+    return faces.reshape(-1, 3)
+
+def gridEdges(rows, cols, step=1):
+    '''The edges of gridFaces: rows, columns and the diagonal of every cell.
+    '''
+    index = gridIndex(rows, cols, step)
+    return np.concatenate([np.stack([index[:, :-1].ravel(), index[:, 1:].ravel()], axis=1),
+                           np.stack([index[:-1, :].ravel(), index[1:, :].ravel()], axis=1),
+                           np.stack([index[:-1, 1:].ravel(), index[1:, :-1].ravel()], axis=1)])
+
+def gridIndexes(kind, rows, cols, step=1):
+    return (gridFaces if kind == 'faces' else gridEdges)(rows, cols, step)
+
+
+class GridSurfaceRenderer():
+    """
+    Draws a surface sampled on a regular grid from vertex buffer objects.
+
+    The triangle and edge index buffers only depend on the grid's shape, so they
+    are built once per shape and shared by every surface. Vertex positions,
+    normals and colors live in persistent buffers of their own: new data is
+    written into CPU-side staging arrays in place and streamed into the
+    existing buffers with glBufferSubData, and only the attributes that
+    changed are sent. The buffers are only reallocated when the grid shape
+    changes.
+
+    Normals come straight from the gradient of the height grid instead of
+    being averaged over the triangles.
+
+    Grid points with undefined heights (the 'holes' fill mode) are left out by
+    drawing from index buffers that skip them, built for that data only.
+
+    paint can draw a coarser level of detail that only joins every 2nd, 4th,
+    ... vertex of the grid, without its edges, for while the camera is being
+    moved. The levels are just other index buffers into the same vertex
+    buffers, so they cost nothing to keep up to date.
+
+    setData and setColors can be called at any time; the upload happens in
+    paint, with the GL context current.
+
+    Shader programs that read pyqtgraph's generic vertex attributes (a_position,
+    a_normal, a_color, with the u_mvp and u_normal matrices) are fed those,
+    like GLMeshItem.paint does; programs without them, as in older pyqtgraph
+    versions, get the fixed-function vertex, normal and color arrays.
+    """
+    # (rows, cols): {(kind, step): (buffer, count)}, kind being 'faces' or 'edges'
+    indexBuffers = {}
+    # renderers holding buffers; the shared index buffers go with the last one
+    active = 0
+
+    def __init__(self, name=None):
+        # the surface's name, for the profiler
+        self.name = name
+        self.shape = None
+        self.x = None
+        self.y = None
+        self.vertexes = None
+        self.normals = None
+        self.colors = None
+
+        # while some heights are undefined, which points are defined, and the
+        # index arrays built from it by (kind, step) that are used instead of the shared ones
+        self.finite = None
+        self.holes = {}
+
+        # attribute name: (buffer, size in bytes)
+        self.buffers = {}
+        self.dirty = set()
+        # counted in GridSurfaceRenderer.active
+        self.painted = False
+
+    def setData(self, x, y, z):
+        '''Shows heights *z* over the grid of *x* by *y* (1-D) scene coordinates.
+        '''
+        rows, cols = z.shape
+        if (rows, cols) != self.shape:
+            self.shape = (rows, cols)
+            self.vertexes = np.empty((rows, cols, 3), dtype=np.float32)
+            self.normals = np.empty((rows, cols, 3), dtype=np.float32)
+            self.x = self.y = None
+        if self.x is None or not np.array_equal(x, self.x):
+            self.vertexes[..., 0] = x[:, None]
+            self.x = np.array(x)
+        if self.y is None or not np.array_equal(y, self.y):
+            self.vertexes[..., 1] = y[None, :]
+            self.y = np.array(y)
+        self.vertexes[..., 2] = z
+        with profiler.span('normals', self.name):
+            self.computeNormals(z)
+        self.dirty |= {'vertexes', 'normals'}
+
+        finite = np.isfinite(z).reshape(-1)
+        self.finite = None if finite.all() else finite
+        self.holes = {}
+
+    def computeNormals(self, z):
+        normals = self.normals
+        if min(z.shape) < 2:
+            normals[...] = (0, 0, 1)
+            return
+        dzdx, dzdy = np.gradient(z, self.x, self.y)
+        normals[..., 0] = -dzdx
+        normals[..., 1] = -dzdy
+        normals[..., 2] = 1
+        normals /= np.sqrt((normals**2).sum(axis=2))[..., None]
+        # next to undefined points
+        normals[~np.isfinite(normals).all(axis=2)] = (0, 0, 1)
+
+    def setColors(self, colors):
+        '''Per-vertex colors shaped like the grid plus 4 channels, uint8 or float;
+           None draws the surface in a single color.
+        '''
+        self.colors = colors
+        self.dirty |= {'colors'}
+
+    def upload(self, name, data, target=ogl.GL_ARRAY_BUFFER):
+        data = np.ascontiguousarray(data)
+        buffer, size = self.buffers.get(name, (None, 0))
+        if buffer is None:
+            buffer = ogl.glGenBuffers(1)
+        ogl.glBindBuffer(target, buffer)
+        if size == data.nbytes:
+            ogl.glBufferSubData(target, 0, data.nbytes, data)
+        else:
+            ogl.glBufferData(target, data.nbytes, data, ogl.GL_DYNAMIC_DRAW)
+        ogl.glBindBuffer(target, 0)
+        self.buffers[name] = (buffer, data.nbytes)
+
+    def indexBuffer(self, kind, step=1):
+        '''Returns ``(buffer, count)`` of the 'faces' or 'edges' indexes to draw,
+           joining every *step*-th vertex.
+        '''
+        if self.finite is not None:
+            if (kind, step) not in self.holes:
+                indexes = gridIndexes(kind, *self.shape, step)
+                self.holes[(kind, step)] = indexes = indexes[self.finite[indexes].all(axis=1)]
+                self.upload((kind, step), indexes, ogl.GL_ELEMENT_ARRAY_BUFFER)
+            return self.buffers[(kind, step)][0], self.holes[(kind, step)].size
+
+        shared = self.indexBuffers.setdefault(self.shape, {})
+        if (kind, step) not in shared:
+            indexes = gridIndexes(kind, *self.shape, step)
+            buffer = ogl.glGenBuffers(1)
+            ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, buffer)
+            ogl.glBufferData(ogl.GL_ELEMENT_ARRAY_BUFFER, indexes.nbytes, indexes, ogl.GL_STATIC_DRAW)
+            ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, 0)
+            shared[(kind, step)] = (buffer, indexes.size)
+        return shared[(kind, step)]
+
+    def levelStep(self, maxPoints):
+        '''Returns the smallest power of 2 step at which the grid has at most
+           *maxPoints* points per side (1 for the full grid).
+        '''
+        step = 1
+        if maxPoints:
+            while (max(self.shape) - 1)//step + 1 > maxPoints:
+                step *= 2
+        return step
+
+    def paint(self, item, maxPoints=None):
+        '''Draws the surface like GLMeshItem.paint would, with the shader and the
+           GLMeshItem options (drawFaces, drawEdges, color, edgeColor) of *item*.
+           With *maxPoints*, a coarser level of detail with at most that many points
+           per side is drawn if the grid is larger, and its edges are skipped.
+        '''
+        if self.shape is None:
+            return
+        if not self.painted:
+            self.painted = True
+            GridSurfaceRenderer.active += 1
+        opts = item.opts
+        step = self.levelStep(maxPoints)
+        if self.dirty & {'vertexes', 'normals', 'colors'}:
+            with profiler.span('upload', self.name):
+                for name in ('vertexes', 'normals', 'colors'):
+                    if name in self.dirty:
+                        if name != 'colors' or self.colors is not None:
+                            self.upload(name, getattr(self, name))
+                        self.dirty.discard(name)
+
+        try:
+            if opts['drawFaces']:
+                colored = self.colors is not None and self.colors.size == 4*self.shape[0]*self.shape[1]
+                # without colors (or not yet the ones for this grid) it is drawn in one color
+                self.draw(item, item.shader(), ogl.GL_TRIANGLES, self.indexBuffer('faces', step),
+                          opts['color'], colored, normals=True)
+
+            if opts['drawEdges'] and step == 1:
+                self.draw(item, shaders.getShaderProgram(None), ogl.GL_LINES, self.indexBuffer('edges'),
+                          opts['edgeColor'], False, normals=False)
+        finally:
+            ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, 0)
+            ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, 0)
+
+    def draw(self, item, shader, mode, indexes, color, colored, normals):
+        '''Draws the elements *indexes* (buffer, count) with *shader*, in the
+           per-vertex colors if *colored* and otherwise in *color*.
+        '''
+        if isinstance(color, QColor):
+            color = fn.glColor(color)
+        buffer, count = indexes
+        program = shader.program() if shader.shaders else None
+        if program is None or ogl.glGetAttribLocation(program, "a_position") == -1:
+            return self.drawFixedFunction(shader, mode, buffer, count, color, colored, normals)
+
+        enabled = []
+        def bind(attribute, name, size, type, normalized=False):
+            location = ogl.glGetAttribLocation(program, attribute)
+            if location != -1:
+                ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self.buffers[name][0])
+                ogl.glVertexAttribPointer(location, size, type, normalized, 0, None)
+                ogl.glEnableVertexAttribArray(location)
+                enabled.append(location)
+            return location
+
+        bind("a_position", 'vertexes', 3, ogl.GL_FLOAT)
+        if normals:
+            bind("a_normal", 'normals', 3, ogl.GL_FLOAT)
+        if colored:
+            uint8 = self.colors.dtype == np.uint8
+            bind("a_color", 'colors', 4, ogl.GL_UNSIGNED_BYTE if uint8 else ogl.GL_FLOAT, uint8)
+        elif ogl.glGetAttribLocation(program, "a_color") != -1:
+            ogl.glVertexAttrib4f(ogl.glGetAttribLocation(program, "a_color"), *color)
+        try:
+            with shader:
+                ogl.glUniformMatrix4fv(ogl.glGetUniformLocation(program, "u_mvp"), 1, False,
+                                       np.array(item.mvpMatrix().data(), dtype=np.float32))
+                location = ogl.glGetUniformLocation(program, "u_normal")
+                if location != -1:
+                    ogl.glUniformMatrix3fv(location, 1, False,
+                                           np.array(item.modelViewMatrix().normalMatrix().data(), dtype=np.float32))
+                ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, buffer)
+                ogl.glDrawElements(mode, count, ogl.GL_UNSIGNED_INT, None)
+        finally:
+            for location in enabled:
+                ogl.glDisableVertexAttribArray(location)
+
+    def drawFixedFunction(self, shader, mode, buffer, count, color, colored, normals):
+        ogl.glEnableClientState(ogl.GL_VERTEX_ARRAY)
+        ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self.buffers['vertexes'][0])
+        ogl.glVertexPointer(3, ogl.GL_FLOAT, 0, None)
+        try:
+            with shader:
+                if colored:
+                    ogl.glEnableClientState(ogl.GL_COLOR_ARRAY)
+                    ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self.buffers['colors'][0])
+                    ogl.glColorPointer(4, ogl.GL_UNSIGNED_BYTE if self.colors.dtype == np.uint8
+                                          else ogl.GL_FLOAT, 0, None)
+                else:
+                    ogl.glColor4f(*color)
+                if normals:
+                    ogl.glEnableClientState(ogl.GL_NORMAL_ARRAY)
+                    ogl.glBindBuffer(ogl.GL_ARRAY_BUFFER, self.buffers['normals'][0])
+                    ogl.glNormalPointer(ogl.GL_FLOAT, 0, None)
+
+                ogl.glBindBuffer(ogl.GL_ELEMENT_ARRAY_BUFFER, buffer)
+                ogl.glDrawElements(mode, count, ogl.GL_UNSIGNED_INT, None)
+        finally:
+            ogl.glDisableClientState(ogl.GL_NORMAL_ARRAY)
+            ogl.glDisableClientState(ogl.GL_COLOR_ARRAY)
+            ogl.glDisableClientState(ogl.GL_VERTEX_ARRAY)
+
+    def release(self):
+        '''Deletes this surface's buffers, and the shared index buffers if no
+           other surface is using them; the GL context must be current.
+        '''
+        if self.buffers:
+            ogl.glDeleteBuffers(len(self.buffers), [buffer for buffer, _ in self.buffers.values()])
+        self.buffers = {}
+        self.holes = {}
+        self.dirty = {'vertexes', 'normals', 'colors'}
+        if self.painted:
+            self.painted = False
+            GridSurfaceRenderer.active -= 1
+            if GridSurfaceRenderer.active == 0:
+                shared = [buffer for buffers in self.indexBuffers.values() for buffer, _ in buffers.values()]
+                if shared:
+                    ogl.glDeleteBuffers(len(shared), shared)
+                self.indexBuffers.clear()
@@ -0,0 +1,129 @@
+import numpy as np
+
+import OpenGL.GL as ogl
+from pyqtgraph.opengl import shaders
+
+from Components.utils.ColormapLUT import ColormapLUT
+
+
+# colormap textures are small, every OpenGL implementation supports 2-D textures this wide
+textureLUT = ColormapLUT(size=256)
+
+# pyqtgraph 0.13 and later feed shaders generic attributes and matrices (see
+# GridSurfaceRenderer), older versions the fixed-function inputs; the vertex
+# shader follows whichever the 'shaded' program uses
+attributeInputs = 'a_position' in shaders.getShaderProgram('shaded').shaders[0].code
+
+# plain GLSL 1.10 / ES 1.00 so it also runs on Mesa's software rasterizers
+_vertexShader = """
+uniform mat4 u_mvp;
+uniform mat3 u_normal;
+uniform float zrange[2];
+attribute vec4 a_position;
+attribute vec3 a_normal;
+varying vec3 v_normal;
+varying float v_height;
+void main() {
+    // height on the colormap, 0 at the lowest point of the surface and 1 at the highest
+    v_height = (a_position.z - zrange[0]) / max(zrange[1] - zrange[0], 1e-30);
+    v_normal = normalize(u_normal * a_normal);
+    gl_Position = u_mvp * a_position;
+}
+"""
+
+_fixedFunctionVertexShader = """
+uniform float zrange[2];
+varying vec3 v_normal;
+varying float v_height;
+void main() {
+    v_height = (gl_Vertex.z - zrange[0]) / max(zrange[1] - zrange[0], 1e-30);
+    v_normal = normalize(gl_NormalMatrix * gl_Normal);
+    gl_Position = ftransform();
+}
+"""
+
+_fragmentShader = """
+#ifdef GL_ES
+precision mediump float;
+#endif
+uniform sampler2D colormap;
+varying vec3 v_normal;
+varying float v_height;
+void main() {
+    // sample texel centers so both ends of the colormap are reached exactly
+    float t = (0.5 + clamp(v_height, 0.0, 1.0) * %(last).1f) / %(size).1f;
+    vec4 color = texture2D(colormap, vec2(t, 0.5));
+    // the same lighting as pyqtgraph's 'shaded' shader
+    float p = dot(v_normal, normalize(vec3(1.0, -1.0, -1.0)));
+    p = p < 0. ? 0. : p * 0.8;
+    gl_FragColor = vec4(color.rgb * (0.2 + p), color.a);
+}
+"""
+
+
+class HeightColormapShader(shaders.ShaderProgram):
+    """
+    Colors a surface by height on the GPU: the colormap is a 1-pixel-high
+    texture and the vertex shader places each vertex on it using the
+    ``zrange`` uniform, so no per-vertex colors have to be computed or uploaded.
+
+    One program is shared by every surface (heightColormapShader): each
+    surface keeps its own colormap and height range and passes them to
+    prepare() right before it draws. Colormap textures are created on first
+    use and shared as well, since all surfaces draw into the same GraphView.
+    """
+    # cmap_name: texture id
+    textures = {}
+
+    def __init__(self, name='heightColormap'):
+        super(HeightColormapShader, self).__init__(name, [
+            shaders.VertexShader(_vertexShader if attributeInputs else _fixedFunctionVertexShader),
+            shaders.FragmentShader(_fragmentShader % {'last': textureLUT.size - 1, 'size': textureLUT.size})
+        ], uniforms={'zrange': [0., 1.]})
+        self.cmap_name = None
+
+    @staticmethod
+    def heightRange(zs):
+        '''Returns the lowest and highest defined values of *zs*, the heights
+           that go onto the ends of the colormap.
+        '''
+        finite = zs[np.isfinite(zs)]
+        return [float(finite.min()), float(finite.max())] if finite.size else [0., 1.]
+
+    def prepare(self, cmap_name, zrange):
+        '''Sets the colormap and height range of the surface about to be drawn.
+        '''
+        self.cmap_name = cmap_name
+        self['zrange'] = zrange
+
+    def texture(self):
+        '''Returns the texture of the current colormap, uploading it the first time.
+           Must be called with the GL context current.
+        '''
+        if self.cmap_name not in self.textures:
+            table = np.ascontiguousarray(textureLUT.table(self.cmap_name, np.uint8)[:textureLUT.size])
+            texture = ogl.glGenTextures(1)
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, texture)
+            ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MIN_FILTER, ogl.GL_LINEAR)
+            ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_MAG_FILTER, ogl.GL_LINEAR)
+            ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_WRAP_S, ogl.GL_CLAMP_TO_EDGE)
+            ogl.glTexParameteri(ogl.GL_TEXTURE_2D, ogl.GL_TEXTURE_WRAP_T, ogl.GL_CLAMP_TO_EDGE)
+            ogl.glTexImage2D(ogl.GL_TEXTURE_2D, 0, ogl.GL_RGBA, textureLUT.size, 1, 0,
+                             ogl.GL_RGBA, ogl.GL_UNSIGNED_BYTE, table)
+            ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+            self.textures[self.cmap_name] = texture
+        return self.textures[self.cmap_name]
+
+    def __enter__(self):
+        # the colormap sampler is left at its default, texture unit 0
+        ogl.glActiveTexture(ogl.GL_TEXTURE0)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, self.texture())
+        return super(HeightColormapShader, self).__enter__()
+
+    def __exit__(self, *args):
+        super(HeightColormapShader, self).__exit__(*args)
+        ogl.glBindTexture(ogl.GL_TEXTURE_2D, 0)
+
+
+# shared by every SurfacePlot
+heightColormapShader = HeightColormapShader()
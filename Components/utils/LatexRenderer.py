@@ -0,0 +1,150 @@
+import os
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from PyQt5.QtGui import QImage, QPixmap
+
+from Components.utils.EvaluationBackends import CACHE_DIR
+
+
+class LatexRenderer():
+    """
+    Typesets LaTeX math offline with matplotlib's mathtext and returns it as
+    QPixmaps, for every LatexDisplay to show.
+
+    One figure is kept and reused for all renders, and rendered pixmaps are
+    kept in an LRU cache keyed on (latex, fontsize, color, device pixel
+    ratio), so showing an equation again costs nothing. LaTeX that mathtext
+    can't typeset is shown as plain text.
+
+    Renders are also saved as PNGs in CACHE_DIR/latex, so equations from an
+    earlier session are loaded rather than typeset again. That directory is
+    an LRU as well: files are touched when used, and the least recently used
+    are deleted once the directory grows past diskLimit bytes.
+
+    Must be used from the GUI thread (QPixmap).
+    """
+    # padding around the typeset math, in points
+    padding = 2
+    # part of every disk cache key, change it when the output of rasterize changes
+    version = 1
+
+    def __init__(self, maxsize=512, directory=os.path.join(CACHE_DIR, "latex"), diskLimit=32*2**20):
+        self.maxsize = maxsize
+        self.pixmaps = OrderedDict()
+        self.directory = directory
+        self.diskLimit = diskLimit
+        # bytes used in directory, counted on first use
+        self.diskUsage = None
+        self.figure = Figure(figsize=(1, 1))
+        self.figure.patch.set_alpha(0)
+        self.canvas = FigureCanvasAgg(self.figure)
+
+    def render(self, latex, fontsize=18, color='#ffffff', dpr=1.0):
+        '''Returns a QPixmap of *latex* (math mode, without the $ signs) in
+           *fontsize* points at 96 dpi, for a screen with device pixel ratio *dpr*.
+        '''
+        key = (latex, fontsize, color, dpr)
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+
+        path = self.diskPath(key)
+        image = self.load(path)
+        if image is None:
+            try:
+                # displayed like MathJax's $$...$$, mathtext sets \frac inline
+                rgba = self.rasterize("$" + latex.replace(r"\frac", r"\dfrac") + "$", fontsize, color, 96*dpr)
+            except Exception:
+                # not something mathtext understands
+                rgba = self.rasterize(latex.replace("$", r"\$"), fontsize, color, 96*dpr)
+
+            height, width = rgba.shape[:2]
+            image = QImage(rgba.data, width, height, 4*width, QImage.Format_RGBA8888).copy()
+            self.save(image, path)
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(dpr)
+
+        self.pixmaps[key] = pixmap
+        while len(self.pixmaps) > self.maxsize:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def diskPath(self, key):
+        digest = hashlib.sha1(repr((self.version, matplotlib.__version__) + key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + ".png")
+
+    def load(self, path):
+        '''Returns the image cached at *path*, or None.
+        '''
+        if not os.path.exists(path):
+            return None
+        image = QImage(path)
+        if image.isNull():
+            return None
+        try:
+            # most recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def save(self, image, path):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if not image.save(path, "PNG"):
+                return
+            if self.diskUsage is None:
+                self.diskUsage = sum(entry.stat().st_size for entry in os.scandir(self.directory))
+            else:
+                self.diskUsage += os.path.getsize(path)
+            if self.diskUsage > self.diskLimit:
+                self.evict()
+        except OSError:
+            # the cache is only an optimization
+            pass
+
+    def evict(self):
+        '''Deletes the least recently used files until the directory is at
+           three quarters of diskLimit.
+        '''
+        entries = sorted(os.scandir(self.directory), key=lambda entry: entry.stat().st_mtime)
+        self.diskUsage = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.diskUsage <= 3*self.diskLimit//4:
+                break
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            self.diskUsage -= size
+
+    def rasterize(self, text, fontsize, color, dpi):
+        '''Returns *text* drawn tightly onto a transparent (height, width, 4) uint8 array.
+        '''
+        figure = self.figure
+        figure.clear()
+        figure.set_dpi(dpi)
+        with matplotlib.rc_context({'mathtext.fontset': 'cm'}):
+            artist = figure.text(0, 0, text, fontsize=fontsize, color=color)
+            try:
+                renderer = self.canvas.get_renderer()
+                bbox = artist.get_window_extent(renderer=renderer)
+                pad = self.padding*dpi/72
+                width, height = bbox.width + 2*pad, bbox.height + 2*pad
+                figure.set_size_inches(max(width, 1)/dpi, max(height, 1)/dpi)
+                # put the text's bottom left corner at (pad, pad) pixels
+                artist.set_position(((pad - bbox.x0)/max(width, 1), (pad - bbox.y0)/max(height, 1)))
+                self.canvas.draw()
+                return np.array(self.canvas.buffer_rgba())
+            finally:
+                figure.clear()
+
+
+# shared by every LatexDisplay
+latexRenderer = LatexRenderer()
@@ -0,0 +1,42 @@
+from collections import deque
+
+import numpy as np
+
+
+class LatencyMetric():
+    """
+    Keeps the most recent latency samples (in milliseconds) for one named
+    measurement in a ring buffer.
+    """
+    def __init__(self, name, maxlen=512):
+        self.name = name
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+
+    def last(self):
+        return self.samples[-1] if self.samples else None
+
+    def summary(self):
+        '''Returns count, mean, median, 95th percentile and max of the buffered samples.
+        '''
+        if not self.samples:
+            return {'count': self.count}
+        samples = np.fromiter(self.samples, dtype=float)
+        return {'count': self.count,
+                'mean': samples.mean(),
+                'p50': np.percentile(samples, 50),
+                'p95': np.percentile(samples, 95),
+                'max': samples.max()}
+
+
+# all metrics recorded so far, indexed by name
+metrics = {}
+
+def getMetric(name):
+    if name not in metrics:
+        metrics[name] = LatencyMetric(name)
+    return metrics[name]
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class NullSpan():
+    """What Profiler.span returns while profiling is off: a context manager that does nothing."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+nullSpan = NullSpan()
+
+
+class Span():
+    def __init__(self, profiler, stage, name, args):
+        self.profiler = profiler
+        self.stage = stage
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.add(self.name, self.stage, self.started, time.perf_counter() - self.started, self.args)
+        return False
+
+
+class Profiler():
+    """
+    Times the stages of the plot pipeline (parsing, compiling, evaluating,
+    validating, colormapping, uploading and painting) as spans::
+
+        with profiler.span('evaluate', surface.name, stride=4):
+            ...
+
+    The most recent spans of each surface name are kept in a ring buffer and
+    can be written out as Chrome trace-event JSON (chrome://tracing, Perfetto).
+    Spans that don't belong to one surface are kept under the name None.
+
+    Profiling is off by default; span() then returns a shared do-nothing
+    context manager, so instrumented code pays one attribute check.
+    """
+    def __init__(self, maxlen=4096):
+        self.enabled = False
+        self.maxlen = maxlen
+        self.origin = time.perf_counter()
+        # surface name: deque of (stage, start, duration, thread id, args), times in seconds
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def span(self, stage, name=None, **args):
+        if not self.enabled:
+            return nullSpan
+        return Span(self, stage, name, args)
+
+    def add(self, name, stage, started, duration, args=None):
+        with self.lock:
+            if name not in self.spans:
+                self.spans[name] = deque(maxlen=self.maxlen)
+            self.spans[name].append((stage, started, duration, threading.get_ident(), args))
+
+    def durations(self, name, stage):
+        '''Returns the buffered durations (ms) of *stage* for the surface *name*.
+        '''
+        with self.lock:
+            return [1000*duration for s, _, duration, _, _ in self.spans.get(name, ()) if s == stage]
+
+    def clear(self):
+        with self.lock:
+            self.spans = {}
+
+    def traceEvents(self):
+        '''Returns the buffered spans as Chrome trace "complete" events.
+        '''
+        pid = os.getpid()
+        events = []
+        with self.lock:
+            for name, spans in self.spans.items():
+                for stage, started, duration, thread, args in spans:
+                    events.append({'name': stage,
+                                   'cat': 'plot' if name is None else str(name),
+                                   'ph': 'X',
+                                   'ts': 1e6*(started - self.origin),
+                                   'dur': 1e6*duration,
+                                   'pid': pid,
+                                   'tid': thread,
+                                   'args': dict(args or {}, surface=name)})
+        events.sort(key=lambda event: event['ts'])
+        return events
+
+    def exportChromeTrace(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.traceEvents(), 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+# shared by the whole plot pipeline
+profiler = Profiler()
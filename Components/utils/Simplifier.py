@@ -0,0 +1,161 @@
+import time
+import multiprocessing
+from collections import OrderedDict
+
+from sympy import sympify, simplify, latex
+
+from PyQt5.QtCore import (QCoreApplication, QObject, QTimer, pyqtSignal)
+
+
+def _serve(connection):
+    '''Runs in the worker process: sends None once it is ready, then simplifies
+       each text received and sends back (text, LaTeX), or (text, None) if that fails.
+    '''
+    connection.send(None)
+    while True:
+        text = connection.recv()
+        if text is None:
+            return
+        try:
+            result = latex(simplify(sympify(text)))
+        except Exception:
+            result = None
+        connection.send((text, result))
+
+
+class Simplifier(QObject):
+    """
+    Simplifies equations with sympy in a worker process and emits
+    ``finished(text, latex)`` on the GUI thread when one is done.
+
+    The worker simplifies one text at a time. A request arriving while it is
+    busy waits for it, replacing any other waiting request, so while the user
+    types only the text they stopped at is simplified next. The worker is never
+    interrupted for a newer request: what it is working on is finished and
+    memoized under its own text, and rows that have moved on ignore it.
+
+    Each simplification gets *budget* seconds, not counting the worker's
+    startup; past that the worker is killed (and started again for the next
+    one) and ``finished`` is emitted with None.
+
+    Results, including failures and timeouts, are memoized per normalized
+    text in an LRU; a timeout is retried if the budget has since been raised.
+    """
+    finished = pyqtSignal(str, object)
+
+    def __init__(self, budget=2.0, maxsize=256, parent=None):
+        super(Simplifier, self).__init__(parent)
+        self.budget = budget
+        self.maxsize = maxsize
+        # text: (latex or None, budget it was given)
+        self.results = OrderedDict()
+
+        self.process = None
+        self.connection = None
+        self.running = None # text being simplified
+        self.pending = None # text to simplify next
+        self.started = None # when the worker started on it, None until the worker is ready
+
+        self.pollTimer = QTimer(self)
+        self.pollTimer.setInterval(50)
+        self.pollTimer.timeout.connect(self.poll)
+
+        # the worker process goes with the app
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def setBudget(self, seconds):
+        self.budget = seconds
+
+    def lookup(self, text):
+        '''Returns ``(True, latex)`` if *text* has been simplified (latex is None
+           if that failed), otherwise ``(False, None)``.
+        '''
+        result = self.results.get(text)
+        if result is None or (result[0] is None and result[1] < self.budget):
+            return False, None
+        self.results.move_to_end(text)
+        return True, result[0]
+
+    def request(self, text):
+        '''Starts simplifying *text*, or queues it while the worker is busy,
+           unless it is already being simplified or was before; see lookup().
+        '''
+        if self.lookup(text)[0] or text == self.running:
+            return
+        if self.running is None:
+            self.send(text)
+        else:
+            self.pending = text
+
+    def send(self, text):
+        if self.process is None:
+            self.startWorker()
+            self.started = None
+        else:
+            self.started = time.perf_counter()
+        self.connection.send(text)
+        self.running = text
+        self.pollTimer.start()
+
+    def startWorker(self):
+        # spawn, forking a process that is running Qt threads isn't safe
+        context = multiprocessing.get_context('spawn')
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def stopWorker(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+        self.process = self.connection = None
+        self.running = None
+        self.pollTimer.stop()
+
+    def poll(self):
+        if self.running is None:
+            return
+        text, result = self.running, None
+        while self.connection.poll():
+            message = self.connection.recv()
+            if message is None:
+                # the worker is ready, the budget starts now
+                self.started = time.perf_counter()
+                continue
+            text, result = message
+            break
+        else:
+            if self.started is None or time.perf_counter() - self.started <= self.budget:
+                return
+            # out of time, the worker can't be interrupted any other way
+            self.stopWorker()
+
+        self.results[text] = (result, self.budget)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+        # on to the next one before anyone hears of this one, they may ask for more
+        self.running, pending, self.pending = None, self.pending, None
+        if pending is not None and not self.lookup(pending)[0]:
+            self.send(pending)
+        else:
+            self.pollTimer.stop()
+        self.finished.emit(text, result)
+
+    def shutdown(self):
+        self.pending = None
+        if self.process is not None:
+            self.stopWorker()
+
+
+# shared by every EquationTableItem, created on first use
+simplifier = None
+
+def getSimplifier():
+    global simplifier
+    if simplifier is None:
+        simplifier = Simplifier()
+    return simplifier
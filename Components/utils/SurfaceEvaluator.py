@@ -0,0 +1,221 @@
+import time
+import traceback
+
+import numpy as np
+import sympy as sy
+
+from PyQt5.QtCore import (QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal)
+
+from Components.utils.EvaluationBackends import compileExpression
+from Components.utils.Metrics import getMetric
+from Components.utils.Profiler import profiler
+from Components.utils.TiledEvaluator import TiledEvaluator
+
+
+class SurfaceEvaluationJob(QRunnable):
+    """
+    Evaluates a SurfacePlot's equation over its grid on a worker thread, then
+    validates and colormaps the result.
+
+    With adaptive sampling the surface's AdaptiveSampler is used instead and the
+    result is a triangle mesh.
+
+    Large grids are refined coarse-to-fine: each level is handed back to the GUI
+    thread as soon as it is ready, and only the points that are not already on
+    the previous (twice as coarse) level are evaluated.
+
+    Grids big enough for it are evaluated by the evaluator's TiledEvaluator:
+    the z buffer lives in shared memory and the job only waits while worker
+    processes fill it in.
+
+    Everything the job needs is copied off the surface when it is created so the
+    GUI thread is free to keep changing the surface while the job runs. Between
+    stages the job checks whether a newer job has been submitted for the same
+    surface and, if so, quietly gives up.
+    """
+    def __init__(self, evaluator, name, generation, surface):
+        super(SurfaceEvaluationJob, self).__init__()
+        self.evaluator = evaluator
+        self.name = name
+        self.generation = generation
+
+        self.equation = surface.equation
+        self.expression = surface.expression
+        self.backend = surface.backend
+        self.xs, self.ys = surface.xs, surface.ys
+        self.shape = surface.gridShape()
+        self.tiled = evaluator.tiledEvaluator
+        self.grid = None
+        self.strides = surface.refinementStrides()
+        self.sampler = surface.adaptiveSampler() if surface.samplingMode == 'adaptive' else None
+        self.cmap_name = surface.cmap_name
+        self.colorMode = surface.colorMode
+        self.fillMode = surface.fillMode
+        self.validateData = surface.validateData
+        self.colormapData = surface.colormapData
+
+    def isStale(self):
+        return not self.evaluator.isCurrent(self.name, self.generation)
+
+    def compile(self):
+        '''Compiles the expression with the surface's backend here rather than on the
+           GUI thread, since numba in particular can take a while.
+        '''
+        if self.expression is not None:
+            with profiler.span('lambdify', self.name, backend=self.backend):
+                self.equation, self.backend = compileExpression(self.expression, self.backend)
+        else:
+            self.backend = 'numpy'
+
+    def record(self, seconds):
+        ms = 1000*seconds
+        getMetric("evaluate." + self.backend).record(ms)
+        self.evaluator.timings[self.name] = (self.backend, ms)
+
+    def allocate(self):
+        if self.expression is None or np.prod(self.shape) < self.tiled.threshold:
+            return np.empty(self.shape)
+        self.source = sy.srepr(self.expression)
+        self.grid = self.tiled.allocate(self.shape)
+        return self.grid.array()
+
+    def colormap(self, zs, dtype):
+        '''Vertex colors for *zs*, or None if the surface colors itself on the GPU.
+        '''
+        if self.colorMode == 'shader':
+            return None
+        with profiler.span('colormap', self.name):
+            return self.colormapData(zs, self.cmap_name, dtype)
+
+    def evaluate(self, zs, rows, cols):
+        points = len(range(*rows.indices(zs.shape[0]))) * len(range(*cols.indices(zs.shape[1])))
+        with profiler.span('evaluate', self.name, backend=self.backend, points=points):
+            if self.grid is not None and points >= self.tiled.threshold:
+                try:
+                    self.tiled.evaluate(self.source, self.backend, self.grid, self.xs[:, 0], self.ys[0, :],
+                                        rows, cols, self.isStale)
+                    return
+                except Exception:
+                    # fall back to evaluating here
+                    traceback.print_exc()
+            # xs and ys are an open grid, the assignment broadcasts whatever the equation returns
+            zs[rows, cols] = self.equation(self.xs[rows], self.ys[:, cols])
+
+    def run(self):
+        if self.isStale():
+            return
+        try:
+            self.compile()
+        except Exception:
+            traceback.print_exc()
+            return
+        if self.sampler is not None:
+            return self.runAdaptive()
+        try:
+            zs = self.allocate()
+            previous = None
+            elapsed = 0
+            for stride in self.strides:
+                started = time.perf_counter()
+                if previous is None:
+                    self.evaluate(zs, slice(None, None, stride), slice(None, None, stride))
+                else:
+                    # the new points are the odd rows of this level plus the
+                    # odd columns of the even rows
+                    self.evaluate(zs, slice(stride, None, previous), slice(None, None, stride))
+                    self.evaluate(zs, slice(None, None, previous), slice(stride, None, previous))
+                previous = stride
+                elapsed += time.perf_counter() - started
+                if self.isStale():
+                    return
+                if stride == 1:
+                    self.record(elapsed)
+
+                # coarse levels are copied since zs keeps being filled in
+                level = zs if stride == 1 else zs[::stride, ::stride].copy()
+                with profiler.span('validateData', self.name, stride=stride):
+                    level = self.validateData(level, self.fillMode)
+                if self.isStale():
+                    return
+
+                colors = self.colormap(level, np.uint8)
+                self.evaluator.finished.emit(self.name, self.generation, stride, level, colors, self.cmap_name)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            if self.grid is not None:
+                self.grid.unlink()
+
+    def runAdaptive(self):
+        try:
+            started = time.perf_counter()
+            with profiler.span('evaluate', self.name, backend=self.backend, adaptive=True):
+                mesh = self.sampler.sample(self.equation, self.isStale)
+            if mesh is None or self.isStale():
+                return
+            self.record(time.perf_counter() - started)
+            vertexes, faces = mesh
+            # GLMeshItem draws adaptive meshes, it needs float colors
+            colors = self.colormap(vertexes[:, 2], np.float32)
+            self.evaluator.meshFinished.emit(self.name, self.generation, vertexes, faces, colors, self.cmap_name)
+        except Exception:
+            traceback.print_exc()
+
+
+class SurfaceEvaluator(QObject):
+    """
+    Runs surface evaluations for a GraphView on a thread pool and hands the
+    finished z/color buffers (one per refinement level) back to the GUI thread.
+
+    Each surface name in ``owner.data`` has a generation counter which is bumped
+    for every new request; results (and running jobs) belonging to an older
+    generation are dropped.
+
+    ``timings`` holds the backend and evaluation time (ms) of each surface's
+    latest finished job; every job is also recorded in the ``evaluate.<backend>``
+    metric.
+    """
+    # name, generation, stride, zs, colors, cmap_name
+    finished = pyqtSignal(object, int, int, object, object, str)
+    # name, generation, vertexes, faces, colors, cmap_name
+    meshFinished = pyqtSignal(object, int, object, object, object, str)
+
+    def __init__(self, owner, parent=None):
+        super(SurfaceEvaluator, self).__init__(parent)
+        self.owner = owner
+        self.pool = QThreadPool(self)
+        self.tiledEvaluator = TiledEvaluator()
+        self.generations = {}
+        self.timings = {}
+
+        # emitted from worker threads, so this is delivered on the GUI thread
+        self.finished.connect(self.receive)
+        self.meshFinished.connect(self.receiveMesh)
+
+        # the tiled evaluator's worker processes go with the app
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.tiledEvaluator.shutdown)
+
+    def submit(self, name):
+        """Queues a new evaluation of the surface stored under *name*."""
+        generation = self.cancel(name)
+        self.pool.start(SurfaceEvaluationJob(self, name, generation, self.owner.data[name]))
+
+    def cancel(self, name):
+        """Invalidates any queued or running job for *name*; returns the new generation."""
+        self.generations[name] = self.generations.get(name, 0) + 1
+        return self.generations[name]
+
+    def isCurrent(self, name, generation):
+        return self.generations.get(name) == generation
+
+    def receive(self, name, generation, stride, zs, colors, cmap_name):
+        if not self.isCurrent(name, generation) or name not in self.owner.data:
+            return
+        self.owner.data[name].receiveData(zs, colors, cmap_name, stride)
+
+    def receiveMesh(self, name, generation, vertexes, faces, colors, cmap_name):
+        if not self.isCurrent(name, generation) or name not in self.owner.data:
+            return
+        self.owner.data[name].receiveMesh(vertexes, faces, colors, cmap_name)
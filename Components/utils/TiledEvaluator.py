@@ -0,0 +1,132 @@
+import os
+import threading
+import concurrent.futures
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from sympy import sympify
+
+from Components.utils.EvaluationBackends import compileExpression
+
+
+# callables compiled by this (worker) process, indexed by the srepr they came from
+_compiled = {}
+
+def _initWorker():
+    # the pool already runs one process per core, so the backends shouldn't
+    # start threads of their own
+    os.environ['NUMBA_NUM_THREADS'] = '1'
+    os.environ['NUMEXPR_NUM_THREADS'] = '1'
+
+def _compile(source, backend):
+    if (source, backend) not in _compiled:
+        _compiled[(source, backend)] = compileExpression(sympify(source), backend)[0]
+    return _compiled[(source, backend)]
+
+def _evaluateTile(source, backend, bufferName, shape, xaxis, yaxis, rows, cols):
+    '''Runs in a worker process: evaluates one tile of the grid straight into the
+       shared z buffer.
+    '''
+    shm = SharedMemory(name=bufferName)
+    try:
+        zs = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        zs[rows, cols] = _compile(source, backend)(xaxis[rows][:, None], yaxis[cols][None, :])
+        del zs
+    finally:
+        shm.close()
+
+
+class SharedGrid():
+    """
+    A float64 z buffer in shared memory that worker processes can write into.
+
+    ``array()`` returns a numpy view whose base is this object, so the mapping
+    stays alive exactly as long as some array still uses it; there is nothing
+    to release by hand.
+    """
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self.shm = SharedMemory(create=True, size=max(int(np.prod(self.shape))*8, 1))
+        self.name = self.shm.name
+        address = np.frombuffer(self.shm.buf, dtype=np.uint8).ctypes.data
+        self.__array_interface__ = {'version': 3, 'shape': self.shape,
+                                    'typestr': '<f8', 'data': (address, False)}
+
+    def array(self):
+        return np.asarray(self)
+
+    def unlink(self):
+        '''Removes the buffer's name once no more workers need to attach to it.
+        '''
+        if self.name is not None:
+            self.shm.unlink()
+            self.name = None
+
+
+class TiledEvaluator():
+    """
+    Evaluates an expression over large grids on a pool of worker processes.
+
+    The grid is cut into bands of *tileRows* rows. Each worker receives the
+    expression as an srepr string, compiles it once per evaluation backend and writes its tiles
+    directly into a SharedGrid, so no results are sent back through the pool.
+    Evaluating fewer than *threshold* points at once is not worth the trip.
+    """
+    def __init__(self, workers=None, tileRows=64, threshold=65536):
+        self.workers = workers or os.cpu_count() or 1
+        self.tileRows = tileRows
+        self.threshold = threshold
+        self.executor = None
+        # jobs on several QThreadPool threads may start the pool at once
+        self.lock = threading.Lock()
+
+    def pool(self):
+        with self.lock:
+            if self.executor is None:
+                # spawn, forking a process that is running Qt threads isn't safe
+                self.executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_initWorker)
+            return self.executor
+
+    def allocate(self, shape):
+        return SharedGrid(shape)
+
+    def evaluate(self, source, backend, grid, xaxis, yaxis, rows, cols, isStale=lambda: False):
+        '''Fills ``grid.array()[rows, cols]`` with the expression *source* (an srepr)
+           evaluated at ``xaxis[rows]`` x ``yaxis[cols]``. Returns False if
+           *isStale* interrupted the work.
+        '''
+        indices = range(*rows.indices(grid.shape[0]))
+        tiles = [indices[i:i + self.tileRows] for i in range(0, len(indices), self.tileRows)]
+        futures = [self.pool().submit(_evaluateTile, source, backend, grid.name, grid.shape, xaxis, yaxis,
+                                      slice(tile.start, tile.stop, tile.step), cols)
+                   for tile in tiles]
+
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=0.05,
+                                                    return_when=concurrent.futures.FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    for f in pending:
+                        f.cancel()
+                    concurrent.futures.wait(pending)
+                    raise future.exception()
+            if pending and isStale():
+                for f in pending:
+                    f.cancel()
+                concurrent.futures.wait(pending)
+                return False
+        return True
+
+    def shutdown(self):
+        '''Stops the worker processes; queued tiles are dropped. The pool is
+           started again if it's needed after all.
+        '''
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
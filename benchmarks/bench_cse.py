@@ -0,0 +1,64 @@
+"""
+Compares the plain lambdify callables 3DGrapher used to plot with against the
+common-subexpression-eliminated ones from compileExpression, on equations of
+the kind people type into the equation table. The compiled functions are timed
+on full coordinate grids and on the open grids (an x column and a y row)
+SurfacePlot evaluates them on.
+
+    python benchmarks/bench_cse.py [points per side]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import sympy as sy
+from sympy import lambdify
+
+from Components.utils.EvaluationBackends import compileExpression
+
+
+corpus = ["sin(x)*cos(y)",
+          "x**2 - y**2",
+          "sin(sqrt(x**2 + y**2))/sqrt(x**2 + y**2)",
+          "exp(-(x**2 + y**2)/10)*cos(x**2 + y**2)",
+          "sin(x*y)*exp(sin(x*y)) + cos(sin(x*y))",
+          "log(x**2 + y**2 + 1)*sin(x**2 + y**2 + 1)",
+          "tanh(x + y)**2 + tanh(x - y)**2 + tanh(x + y)*tanh(x - y)",
+          "(x**2 + y**2 - 1)**3 - x**2*y**3",
+          "cos(x)**2*sin(y)**2 + cos(x)*sin(y) + 1/(1 + cos(x)**2*sin(y)**2)",
+          "sqrt(abs(x*y))*sin(sqrt(abs(x*y)))"]
+
+
+def best(function, xs, ys, repeat=5):
+    with np.errstate(all='ignore'):
+        return min(timeit.repeat(lambda: function(xs, ys), number=1, repeat=repeat))
+
+
+def main(points=1001):
+    x, y = sy.symbols('x y')
+    xs, ys = np.ogrid[-10:10:points*1j, -10:10:points*1j]
+    fullXs, fullYs = np.broadcast_arrays(xs, ys)
+
+    print("{} x {} grid".format(points, points))
+    row = "{:<70} {:>7.1f}ms {:>7.1f}ms {:>7.2f}x {:>7.1f}ms {:>7.2f}x"
+    print("{:<70} {:>9} {:>9} {:>8} {:>9} {:>8}".format("equation", "lambdify", "cse", "speedup",
+                                                        "open", "speedup"))
+    total = np.zeros(3)
+    for text in corpus:
+        expression = sy.sympify(text)
+        function = compileExpression(expression, 'numpy')[0]
+        times = np.array([best(lambdify((x, y), expression), fullXs, fullYs),
+                          best(function, fullXs, fullYs),
+                          best(function, xs, ys)])
+        total += times
+        print(row.format(text, 1000*times[0], 1000*times[1], times[0]/times[1],
+                         1000*times[2], times[0]/times[2]))
+    print(row.format("total", 1000*total[0], 1000*total[1], total[0]/total[1],
+                     1000*total[2], total[0]/total[2]))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
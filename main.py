@@ -1,18 +1,25 @@
-from PyQt5.QtCore import (QFile, QTextStream)
-from PyQt5.QtWidgets import (QApplication)
-
-
-# stylesheet
-import breeze_resources
-
+if __name__ == '__main__':
+    # everything is imported in here: the evaluation and simplification worker
+    # processes are spawned, and each runs this file again as __mp_main__, where
+    # importing the app would only cost them seconds and memory
 
-from Components.App.App import App
+    import sys
+    import os
+    import atexit
 
+    from PyQt5.QtCore import (QFile, QTextStream)
+    from PyQt5.QtWidgets import (QApplication)
 
+    # stylesheet
+    import breeze_resources
 
-if __name__ == '__main__':
+    from Components.App.App import App
+    from Components.utils.Profiler import profiler
 
-    import sys
+    # PLOT_PROFILE=trace.json times the plot pipeline and writes a Chrome trace on exit
+    if os.environ.get('PLOT_PROFILE'):
+        profiler.enabled = True
+        atexit.register(profiler.exportChromeTrace, os.environ['PLOT_PROFILE'])
 
     app = QApplication(sys.argv)
 
@@ -26,4 +33,4 @@ if __name__ == '__main__':
     calc.show()
     sys.exit(app.exec_())
 
-    del calc
\ No newline at end of file
+    del calc
@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+# no display is needed for pixmaps and timers
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,60 @@
+import numpy as np
+
+from Components.utils.AdaptiveSampler import AdaptiveSampler
+
+
+def signedAreas(vertexes, faces):
+    a, b, c = (vertexes[faces[:, k], :2] for k in range(3))
+    return ((b[:, 0] - a[:, 0])*(c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1])*(c[:, 0] - a[:, 0]))/2
+
+
+def test_samples_lie_on_the_surface_and_cover_the_domain():
+    sampler = AdaptiveSampler(10, 5, budget=4000, baseCells=8, maxDepth=4)
+    equation = lambda x, y: np.sin(x)*np.cos(y)
+    vertexes, faces = sampler.sample(equation)
+
+    np.testing.assert_allclose(vertexes[:, 2], equation(vertexes[:, 0], vertexes[:, 1]))
+    assert len(vertexes) == sampler.evaluations
+    # every face is used, none is degenerate, all are wound the same way and
+    # together they tile the whole rectangle
+    assert np.array_equal(np.unique(faces), np.arange(len(vertexes)))
+    areas = signedAreas(vertexes, faces)
+    assert (areas != 0).all() and ((areas > 0).all() or (areas < 0).all())
+    np.testing.assert_allclose(np.abs(areas).sum(), 20*10)
+
+
+def test_budget_is_respected_and_spent_where_the_surface_bends():
+    budget = 1500
+    sampler = AdaptiveSampler(1, 1, budget=budget, baseCells=8, maxDepth=5, tolerance=1e-4)
+    # flat except for a narrow bump around (0.5, 0.5)
+    vertexes, faces = sampler.sample(lambda x, y: np.exp(-((x - 0.5)**2 + (y - 0.5)**2)*200))
+    assert sampler.evaluations <= budget
+    assert sampler.evaluations > budget*0.9
+
+    near = np.hypot(vertexes[:, 0] - 0.5, vertexes[:, 1] - 0.5) < 0.25
+    # a tenth of the area, most of the samples
+    assert near.sum() > len(vertexes)/2
+
+
+def test_smooth_surfaces_stop_early():
+    sampler = AdaptiveSampler(1, 1, budget=100000, baseCells=4, maxDepth=5)
+    vertexes, faces = sampler.sample(lambda x, y: 2*x + y)
+    # a plane has no interpolation error, the base grid is all it takes
+    assert sampler.evaluations == 5*5 + 4*4
+    np.testing.assert_allclose(np.abs(signedAreas(vertexes, faces)).sum(), 4)
+
+
+def test_undefined_regions_are_left_out_of_the_mesh():
+    sampler = AdaptiveSampler(1, 1, budget=5000, baseCells=8, maxDepth=4)
+    with np.errstate(invalid='ignore'):
+        vertexes, faces = sampler.sample(lambda x, y: np.sqrt(x) + y)
+    assert np.isfinite(vertexes[:, 2]).all()
+    assert (vertexes[:, 0] >= 0).all()
+    # the domain's edge is refined, so the mesh reaches close to it
+    assert vertexes[:, 0].min() < 2/(8*2**4)
+    np.testing.assert_allclose(np.abs(signedAreas(vertexes, faces)).sum(), 2, rtol=0.05)
+
+
+def test_stale_work_is_abandoned():
+    sampler = AdaptiveSampler(1, 1)
+    assert sampler.sample(lambda x, y: x*y, isStale=lambda: True) is None
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import matplotlib
+
+from Components.utils.ColormapLUT import ColormapLUT
+
+
+@pytest.mark.parametrize('cmap_name', ['viridis', 'inferno', 'coolwarm', 'gray'])
+def test_colors_match_matplotlib(cmap_name):
+    lut = ColormapLUT()
+    zs = np.random.default_rng(0).normal(size=(50, 70))*5 + 3
+    zs[7, 9] = np.nan
+    cmap = matplotlib.colormaps[cmap_name]
+    finite = zs[np.isfinite(zs)]
+    scaled = np.nan_to_num((zs - finite.min())/(finite.max() - finite.min()))
+
+    colors = lut.apply(zs, cmap_name)
+    assert colors.shape == (50, 70, 4) and colors.dtype == np.float32
+    # exactly matplotlib's colors at the heights rounded to the table, so
+    # never more than one colormap entry away from the unrounded ones
+    quantized = cmap(np.where(np.isnan(zs), np.nan, lut.indices(zs)/(lut.size - 1)))
+    np.testing.assert_array_equal(colors, np.float32(quantized))
+    entries = np.clip((scaled*cmap.N).astype(int), 0, cmap.N - 1)
+    neighbours = [np.float32(cmap(np.clip(entries + d, 0, cmap.N - 1))) for d in (-1, 0, 1)]
+    defined = np.isfinite(zs)
+    assert np.any([(colors == n).all(axis=-1) for n in neighbours], axis=0)[defined].all()
+    np.testing.assert_array_equal(colors[7, 9], np.float32(cmap(np.nan)))
+
+    colors = lut.apply(zs, cmap_name, dtype=np.uint8)
+    assert colors.dtype == np.uint8
+    np.testing.assert_array_equal(colors, np.rint(quantized*255))
+
+
+def test_bounds_skip_undefined_values_across_blocks():
+    lut = ColormapLUT()
+    lut.block = 100
+    zs = np.arange(1000, dtype=float)
+    zs[::7] = np.nan
+    zs[:100] = np.inf
+    assert lut.bounds(zs) == (100, 999, True)
+    assert lut.bounds(np.arange(5.)) == (0, 4, False)
+    assert lut.bounds(np.full(3, np.nan))[2]
+
+
+def test_flat_and_undefined_data():
+    lut = ColormapLUT(size=16)
+    assert (lut.indices(np.full((3, 3), 2.)) == 0).all()
+    assert (lut.indices(np.full((3, 3), np.nan)) == 16).all()
+
+
+def test_colors_are_written_into_a_reusable_buffer():
+    lut = ColormapLUT()
+    zs = np.linspace(0, 1, 20).reshape(4, 5)
+    out = np.empty((4, 5, 4), dtype=np.float32)
+    assert lut.apply(zs, 'viridis', out=out) is out
+    assert lut.apply(zs, 'viridis', out=out[:, :2]) is not out
+    np.testing.assert_array_equal(lut.apply(zs, 'magma', out=out), lut.apply(zs, 'magma'))
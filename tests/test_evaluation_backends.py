@@ -0,0 +1,68 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+import sympy as sy
+from sympy import lambdify
+
+from Components.utils.EvaluationBackends import _cseFunction, _numba
+
+x, y = sy.symbols('x y')
+
+expressions = ["sin(x)*cos(y) + sin(x)**2",
+               "exp(-(x**2 + y**2)/4)*cos(x*y)",
+               "x**2 + 3*x + y**2 - y + x*y",
+               "sqrt(x**2 + y**2) + 1/(1 + sqrt(x**2 + y**2))",
+               "log(x) + tan(y)",
+               "2*x*y*sin(x + y)**3",
+               "abs(x - y)/(x + 2)",
+               "x",
+               "7"]
+
+
+@pytest.mark.parametrize('text', expressions)
+def test_cse_function_matches_lambdify(text):
+    expression = sy.sympify(text)
+    reference = lambdify((x, y), expression)
+    function = _cseFunction(expression)
+
+    xs = np.linspace(-3, 3, 41)
+    ys = np.linspace(-2, 4, 37)
+    xaxis, yaxis = xs[:, None].copy(), ys[None, :].copy()
+    with np.errstate(all='ignore'):
+        expected = np.broadcast_to(reference(xs[:, None], ys[None, :]), (41, 37))
+        # open grid, as the plots evaluate it, and elementwise on full arrays
+        openGrid = np.broadcast_to(function(xaxis, yaxis), (41, 37))
+        full = function(*np.meshgrid(xs, ys, indexing='ij'))
+    np.testing.assert_allclose(openGrid, expected, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(np.broadcast_to(full, (41, 37)), expected, rtol=1e-12, equal_nan=True)
+    # the arguments' buffers are never reused for the results
+    np.testing.assert_array_equal(xaxis, xs[:, None])
+    np.testing.assert_array_equal(yaxis, ys[None, :])
+
+
+_backendInFreshProcess = """
+import sympy
+from Components.utils.EvaluationBackends import compileExpression
+function, backend = compileExpression(sympy.sympify('sin(x)*y + x**2'), 'numba')
+assert abs(function(1.0, 2.0) - (2*__import__('math').sin(1.0) + 1.0)) < 1e-12
+print(backend)
+"""
+
+@pytest.mark.skipif(_numba() is None, reason="numba is not installed")
+def test_numba_cache_is_reloaded_by_a_new_process(tmp_path):
+    # the second process finds the generated module and numba's compiled code
+    # on disk, as the next session (or an evaluation worker) would
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, HOME=str(tmp_path), USERPROFILE=str(tmp_path))
+    for run in range(2):
+        output = subprocess.run([sys.executable, "-c", _backendInFreshProcess], cwd=root, env=environment,
+                                capture_output=True, text=True, timeout=300)
+        assert output.returncode == 0, output.stderr
+        assert output.stdout.split() == ['numba']
+    directory = tmp_path/".3DGrapher"/"cache"/"numba"
+    assert len(list(directory.glob("expr_*.py"))) == 1
+    assert list(directory.glob("__pycache__/expr_*.nbi"))
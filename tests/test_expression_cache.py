@@ -0,0 +1,40 @@
+from Components.utils.ExpressionCache import ExpressionCache
+
+
+def test_lookups_are_counted_and_normalized():
+    cache = ExpressionCache()
+    first = cache.lookup("x + y")
+    assert cache.lookup("x  +   y") is first
+    assert first.valid and first.function(1, 2) == 3
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'size': 1}
+
+
+def test_simplify_flavours_are_separate_entries_sharing_the_function():
+    cache = ExpressionCache()
+    plain = cache.lookup("x*x")
+    simplified = cache.lookup("x*x", simplify=True)
+    assert plain is not simplified
+    assert simplified.function is plain.function
+    assert cache.stats()['size'] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ExpressionCache(maxsize=2)
+    a = cache.lookup("x")
+    cache.lookup("y")
+    assert cache.lookup("x") is a
+    cache.lookup("x + y")
+    assert cache.stats()['size'] == 2
+    assert cache.lookup("x") is a
+    misses = cache.stats()['misses']
+    cache.lookup("y")
+    assert cache.stats()['misses'] == misses + 1
+
+
+def test_invalid_input_is_cached_too():
+    cache = ExpressionCache()
+    broken = cache.lookup("x +* y")
+    assert not broken.valid and broken.function is None
+    assert cache.lookup("x +* y") is broken
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0}
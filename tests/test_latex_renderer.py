@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from Components.utils.LatexRenderer import LatexRenderer
+
+
+@pytest.fixture
+def renderer(app, tmp_path):
+    return LatexRenderer(directory=str(tmp_path/"latex"))
+
+
+def files(renderer):
+    return sorted(os.listdir(renderer.directory))
+
+
+def test_renders_are_kept_in_memory_and_on_disk(renderer):
+    pixmap = renderer.render(r"\frac{x^2}{y}")
+    assert not pixmap.isNull()
+    assert renderer.render(r"\frac{x^2}{y}") is pixmap
+    assert renderer.render(r"\frac{x^2}{y}", color='#000000') is not pixmap
+    assert len(files(renderer)) == 2
+
+
+def test_memory_cache_is_an_lru(renderer):
+    renderer.maxsize = 2
+    a = renderer.render("a")
+    renderer.render("b")
+    assert renderer.render("a") is a
+    renderer.render("c")
+    assert list(key[0] for key in renderer.pixmaps) == ["a", "c"]
+
+
+def test_a_new_session_loads_renders_from_disk(renderer):
+    pixmap = renderer.render(r"\sqrt{x} + \sin(y)", dpr=2.0)
+
+    def rasterize(*args):
+        raise AssertionError("typeset again")
+    session = LatexRenderer(directory=renderer.directory)
+    session.rasterize = rasterize
+    loaded = session.render(r"\sqrt{x} + \sin(y)", dpr=2.0)
+    assert loaded.toImage() == pixmap.toImage()
+    assert loaded.devicePixelRatio() == 2.0
+
+
+def test_least_recently_used_files_are_evicted(renderer):
+    texts = ["x_{}".format(i) for i in range(6)]
+    for i, text in enumerate(texts):
+        renderer.render(text)
+        # a second apart, oldest first
+        path = renderer.diskPath((text, 18, '#ffffff', 1.0))
+        os.utime(path, (1e9 + i, 1e9 + i))
+    sizes = {name: os.path.getsize(os.path.join(renderer.directory, name)) for name in files(renderer)}
+
+    # using the oldest one from disk makes it the newest
+    session = LatexRenderer(directory=renderer.directory, diskLimit=sum(sizes.values()))
+    session.render(texts[0])
+    session.render("y")
+    remaining = files(session)
+    assert sum(os.path.getsize(os.path.join(session.directory, name)) for name in remaining) \
+           <= 3*session.diskLimit//4
+    # deleted oldest first: what is left is the newest few
+    order = texts[1:] + [texts[0], "y"]
+    kept = [os.path.basename(session.diskPath((text, 18, '#ffffff', 1.0))) in remaining for text in order]
+    assert kept == sorted(kept)
+    assert kept[-2:] == [True, True] and not kept[0]
+
+def test_what_mathtext_cannot_typeset_is_shown_as_text(renderer):
+    assert not renderer.render(r"\notacommand{x} $5").isNull()
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from Components.utils.Simplifier import Simplifier
+
+# takes sympy a couple of seconds
+slow = "(x**30 - 1)/(x - 1) + sin(x)**8*cos(y)**8 - gamma(x + 5)/gamma(x + 3)"
+
+
+@pytest.fixture
+def simplifier(app):
+    simplifier = Simplifier(budget=30)
+    yield simplifier
+    simplifier.shutdown()
+
+
+@pytest.fixture
+def emitted(simplifier):
+    results = []
+    simplifier.finished.connect(lambda text, result: results.append((text, result)))
+    return results
+
+
+def waitFor(app, condition, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_results_are_emitted_and_memoized(app, simplifier, emitted):
+    simplifier.request("x + x")
+    waitFor(app, lambda: emitted)
+    assert emitted == [("x + x", "2 x")]
+    assert simplifier.lookup("x + x") == (True, "2 x")
+
+    # memoized, nothing is sent to the worker
+    simplifier.request("x + x")
+    assert simplifier.running is None
+
+
+def test_failures_are_memoized_as_none(app, simplifier, emitted):
+    simplifier.request("x +* y")
+    waitFor(app, lambda: emitted)
+    assert emitted == [("x +* y", None)]
+    assert simplifier.lookup("x +* y") == (True, None)
+
+
+def test_only_the_latest_waiting_request_is_simplified(app, simplifier, emitted):
+    simplifier.request("x*x/x")
+    simplifier.request("y + y")
+    simplifier.request("y*y")
+    waitFor(app, lambda: len(emitted) == 2)
+    assert emitted == [("x*x/x", "x"), ("y*y", "y^{2}")]
+    assert simplifier.lookup("y + y") == (False, None)
+
+
+def test_a_simplification_past_the_budget_is_cut_short(app, simplifier, emitted):
+    simplifier.request("x + x")
+    waitFor(app, lambda: emitted)
+    simplifier.setBudget(0.3)
+
+    started = time.perf_counter()
+    simplifier.request(slow)
+    simplifier.request("y + y")
+    waitFor(app, lambda: len(emitted) == 3)
+    # the worker was killed and a new one took the waiting request
+    assert emitted[1:] == [(slow, None), ("y + y", "2 y")]
+    assert time.perf_counter() - started < 15
+    assert simplifier.lookup(slow) == (True, None)
+
+    # with more time it is tried again
+    simplifier.setBudget(30)
+    assert simplifier.lookup(slow) == (False, None)
+
+
+def test_shutdown_stops_the_worker(app, simplifier, emitted):
+    simplifier.request(slow)
+    simplifier.request("y + y")
+    simplifier.shutdown()
+    assert simplifier.process is None and simplifier.pending is None
+    app.processEvents()
+    assert emitted == []
@@ -0,0 +1,62 @@
+import numpy as np
+
+from Components.SurfacePlot.SurfacePlot import SurfacePlot
+
+
+def grid(n=64):
+    xs = np.linspace(-2, 2, n)
+    return xs[:, None] + 2*xs[None, :]
+
+
+def test_defined_data_is_returned_as_is():
+    zs = grid()
+    assert SurfacePlot.validateData(zs) is zs
+
+
+def test_holes_turn_every_undefined_value_into_nan():
+    zs = grid()
+    zs[3, 4], zs[10, :], zs[20, 20] = np.inf, np.nan, -np.inf
+    holes = SurfacePlot.validateData(zs, 'holes')
+    assert np.array_equal(np.isnan(holes), ~np.isfinite(zs))
+    assert not np.isinf(holes).any()
+    np.testing.assert_array_equal(holes[np.isfinite(zs)], zs[np.isfinite(zs)])
+
+
+def test_fill_inpaints_from_the_neighbours():
+    zs = grid()
+    expected = zs.copy()
+    zs[30:33, 40:43] = np.nan
+    zs[0, 0] = np.inf
+    filled = SurfacePlot.validateData(zs)
+    assert np.isfinite(filled).all()
+    np.testing.assert_array_equal(filled[np.isfinite(zs)], zs[np.isfinite(zs)])
+    # a linear surface is filled back in nearly exactly
+    np.testing.assert_allclose(filled[30:33, 40:43], expected[30:33, 40:43], atol=0.2)
+    np.testing.assert_allclose(filled[0, 0], expected[0, 0], atol=0.2)
+
+
+def test_large_undefined_areas_take_the_nearest_value():
+    zs = grid()
+    zs[:, 20:] = np.nan
+    filled = SurfacePlot.validateData(zs)
+    assert np.isfinite(filled).all()
+    # past the inpainted rings each row repeats the last value it reached
+    rings = 20 + SurfacePlot.inpaintRings
+    np.testing.assert_array_equal(filled[:, rings:], np.repeat(filled[:, rings - 1:rings], 64 - rings, axis=1))
+    # which away from the grid's edges, on a surface linear along the columns,
+    # is its last known value
+    np.testing.assert_allclose(filled[10:-10, -1], zs[10:-10, 19])
+
+
+def test_inpainting_only_changes_the_undefined_points():
+    zs = grid()
+    zs[5, 5] = zs[50, 60] = np.nan
+    invalid = ~np.isfinite(zs)
+    filled = SurfacePlot.inpaintData(zs.copy(), invalid)
+    assert np.isfinite(filled).all()
+    np.testing.assert_array_equal(filled[~invalid], zs[~invalid])
+
+
+def test_all_undefined_becomes_flat():
+    zs = np.full((8, 8), np.nan)
+    np.testing.assert_array_equal(SurfacePlot.validateData(zs), np.zeros((8, 8)))